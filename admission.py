@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from telegram import Update
+from config import Config
+from journal import update_journal
+
+logger = logging.getLogger(__name__)
+
+class AdmissionQueue(asyncio.Queue):
+    """Updater va handlerlar orasidagi chegaralangan navbat.
+
+    - Navbat to'lsa relay xabarlar kutadi (backpressure), /start va yordam
+      kabi "arzon" updatelar esa tashlab yuboriladi (load shedding).
+    - Eskirgan /start va yordam updatelari qabul qilinmaydi.
+    - Bir xil update_id qayta kelsa e'tiborsiz qoldiriladi.
+    """
+
+    def __init__(self, maxsize=None, stale_after=None, dedup_size=10000):
+        super().__init__(maxsize=maxsize or Config.UPDATE_QUEUE_SIZE)
+        self.stale_after = stale_after or Config.UPDATE_STALE_AFTER
+        self._seen_ids = set()
+        self._seen_order = deque()
+        self.dedup_size = dedup_size
+        self._saturated = False
+
+        # Metrikalar
+        self.admitted = 0
+        self.last_received_id = None  # shu jarayonda Telegramdan olingan oxirgi update
+        self.dropped = {'duplicate': 0, 'stale': 0, 'overload': 0}
+        self.max_depth = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+
+    # asyncio.Queue ichki saqlash usullari: har bir element kirgan vaqti bilan saqlanadi
+    def _put(self, item):
+        self._queue.append((time.monotonic(), item))
+
+    def _get(self):
+        enqueued_at, item = self._queue.popleft()
+        self.last_wait = time.monotonic() - enqueued_at
+        self.max_wait = max(self.max_wait, self.last_wait)
+        return item
+
+    async def put(self, item):
+        if isinstance(item, Update):
+            self.last_received_id = item.update_id
+            if not self._admit(item):
+                return
+            if self.full() and self._is_sheddable(item):
+                self.dropped['overload'] += 1
+                return
+            if self.full() and not self._saturated:
+                self._saturated = True
+                logger.warning(f"Update navbati to'ldi ({self.maxsize}), polling sekinlashtirildi")
+            self.admitted += 1
+            # Dispatch dan oldin jurnalga yozamiz (qulashdan keyin tiklash uchun)
+            update_journal.append(item)
+
+        await super().put(item)
+        self.max_depth = max(self.max_depth, self.qsize())
+        if self._saturated and self.qsize() < self.maxsize // 2:
+            self._saturated = False
+            logger.info("Update navbati bo'shadi")
+
+    async def get(self):
+        while True:
+            item = await super().get()
+            # Navbatda uzoq turib qolgan arzon updatelarni ham tashlaymiz
+            if (isinstance(item, Update) and self.last_wait > self.stale_after
+                    and self._is_sheddable(item)):
+                self.dropped['stale'] += 1
+                self.task_done()
+                continue
+            return item
+
+    def remember(self, update_id):
+        """update_id ni ko'rilganlar qatoriga qo'shadi (takrorini tashlash uchun)"""
+        self._seen_ids.add(update_id)
+        self._seen_order.append(update_id)
+        if len(self._seen_order) > self.dedup_size:
+            self._seen_ids.discard(self._seen_order.popleft())
+
+    def seed(self, update_ids):
+        """Oldingi jarayon jurnallagan update_id larni ko'rilganlar qatoriga qo'shadi"""
+        for update_id in update_ids:
+            self.remember(update_id)
+        return len(update_ids)
+
+    def _admit(self, update):
+        """Takroriy va eskirgan updatelarni filtrlaydi"""
+        # Qayta kelgan updatelar (oldingi jarayonnikilari ishga tushganda seed qilinadi).
+        # update_id bilan solishtirilmaydi: uzoq tanaffusdan keyin Telegram
+        # ketma-ketlikni kichikroq qiymatdan boshlashi mumkin
+        if update.update_id in self._seen_ids:
+            self.dropped['duplicate'] += 1
+            return False
+        self.remember(update.update_id)
+
+        if self._is_sheddable(update):
+            message = update.message
+            if message and message.date:
+                age = (datetime.now(timezone.utc) - message.date).total_seconds()
+                if age > self.stale_after:
+                    self.dropped['stale'] += 1
+                    return False
+
+        return True
+
+    @staticmethod
+    def _is_sheddable(update):
+        """Tashlab yuborish mumkin bo'lgan updatelar (relay xabarlar hech qachon)"""
+        if update.callback_query:
+            return update.callback_query.data in Config.SHEDDABLE_CALLBACKS
+
+        message = update.message
+        if message and message.text and message.text.startswith('/'):
+            parts = message.text[1:].split()
+            command = parts[0].split('@')[0] if parts else ''
+            return command in Config.SHEDDABLE_COMMANDS
+
+        return False
+
+    def get_stats(self):
+        """Monitoring uchun navbat holati"""
+        oldest_age = time.monotonic() - self._queue[0][0] if self._queue else 0.0
+        return {
+            'depth': self.qsize(),
+            'max_depth': self.max_depth,
+            'capacity': self.maxsize,
+            'oldest_age': oldest_age,
+            'last_wait': self.last_wait,
+            'max_wait': self.max_wait,
+            'admitted': self.admitted,
+            'dropped': dict(self.dropped),
+        }
+
+# Global navbat (Application va Updater shu navbatdan foydalanadi)
+update_queue = AdmissionQueue()
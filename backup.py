@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class BackupManager:
+    """SQLite backup API orqali bot to'xtamasdan baza nusxasini oladi.
+
+    Nusxa alohida threadda, o'zining ulanishi orqali olinadi: botning
+    tugallanmagan tranzaksiyalari nusxaga tushmaydi va ulanish threadlar
+    orasida bo'lishilmaydi. WAL da nusxa bitta o'qish snapshoti sifatida
+    olinadi - yozuvchi bloklanmaydi va o'zgarishlar nusxani qayta boshlatmaydi.
+    """
+
+    def __init__(self, directory=None, keep=None):
+        self.directory = directory or Config.BACKUP_DIR
+        self.keep = keep or Config.BACKUP_KEEP
+        self._lock = asyncio.Lock()
+        self._task = None
+        self.last_backup = None
+
+    async def start(self):
+        """Rejali nusxa olishni ishga tushiradi"""
+        if Config.BACKUP_INTERVAL:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Rejali nusxa olishni to'xtatadi (boshlangan nusxa tugashini kutadi)"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Thread dagi nusxa olish db yopilishidan oldin tugashi kerak
+        async with self._lock:
+            pass
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(Config.BACKUP_INTERVAL)
+            try:
+                # stop() boshlangan nusxani uzib qo'ymasin
+                await asyncio.shield(self.create_backup())
+            except Exception as e:
+                logger.error(f"Rejali backup xatosi: {e}")
+
+    async def create_backup(self):
+        """Yangi nusxa oladi, tekshiradi va eskilarini o'chiradi.
+
+        (fayl yo'li, hajmi baytda, davomiyligi sekundda) qaytaradi.
+        """
+        async with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Mikrosekund bilan: bir soniyadagi rejali va /backup nusxalari ustma-ust yozilmaydi
+            name = f"{self._prefix()}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.db"
+            path = os.path.join(self.directory, name)
+            partial = path + '.part'
+
+            started = time.monotonic()
+            try:
+                await asyncio.to_thread(self._copy, partial)
+                result = await asyncio.to_thread(self._verify, partial)
+                if result != 'ok':
+                    raise RuntimeError(f"integrity_check: {result}")
+                os.replace(partial, path)
+            except Exception:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+
+            duration = time.monotonic() - started
+            size = os.path.getsize(path)
+            self._rotate()
+
+            self.last_backup = (path, size, duration)
+            logger.info(f"Backup olindi: {path} ({size} bayt, {duration:.2f}s)")
+            return self.last_backup
+
+    def _copy(self, path):
+        source = sqlite3.connect(Config.DATABASE)
+        target = sqlite3.connect(path)
+        try:
+            source.execute(f'PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT * 1000)}')
+            if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+                # Bitta qadam - bitta snapshot (qadamlar orasidagi yozuvlar nusxani qayta boshlatardi)
+                source.backup(target)
+            else:
+                source.backup(
+                    target,
+                    pages=Config.BACKUP_PAGES_PER_STEP,
+                    sleep=Config.BACKUP_STEP_SLEEP
+                )
+        finally:
+            target.close()
+            source.close()
+
+    @staticmethod
+    def _verify(path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            conn.close()
+
+    def _prefix(self):
+        return os.path.splitext(os.path.basename(Config.DATABASE))[0] + '-'
+
+    def _rotate(self):
+        """Faqat oxirgi `keep` ta nusxani qoldiradi"""
+        prefix = self._prefix()
+        snapshots = sorted(
+            f for f in os.listdir(self.directory)
+            if f.startswith(prefix) and f.endswith('.db')
+        )
+        for name in snapshots[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+                logger.info(f"Eski backup o'chirildi: {name}")
+            except OSError as e:
+                logger.warning(f"Backupni o'chirib bo'lmadi ({name}): {e}")
+
+# Global obyekt
+backup_manager = BackupManager()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Qator modellari va sqlite3.Row ni solishtirish (benchmark)
+
+Xotiradagi bazada chats jadvali to'ldiriladi va har bir usul uchun
+qatorlarni yaratish (fetchall), maydonlarga murojaat va bitta qator
+egallaydigan xotira o'lchanadi:
+    python bench_models.py --rows 100000
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+from models import Chat
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Qator modellari benchmarki")
+    parser.add_argument('--rows', type=int, default=100000, help="qatorlar soni")
+    parser.add_argument('--repeat', type=int, default=5, help="takrorlar (eng yaxshisi olinadi)")
+    return parser.parse_args()
+
+def make_connection(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE chats (
+            chat_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user1_id INTEGER,
+            user2_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ended_at TIMESTAMP,
+            is_active INTEGER DEFAULT 1
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO chats (user1_id, user2_id) VALUES (?, ?)',
+        ((i, i + 1) for i in range(rows))
+    )
+    return conn
+
+def fetch(conn, factory):
+    cursor = conn.cursor()
+    cursor.row_factory = factory
+    cursor.execute(f'SELECT {Chat.COLUMNS} FROM chats')
+    return cursor.fetchall()
+
+def access_row(rows, user_id=1):
+    """forward_message dagi murojaatlar: chat_id va sherik"""
+    for chat in rows:
+        chat['chat_id']
+        chat['user2_id'] if chat['user1_id'] == user_id else chat['user1_id']
+
+def access_model(rows, user_id=1):
+    for chat in rows:
+        chat.chat_id
+        chat.partner_of(user_id)
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def bytes_per_row(conn, factory, rows):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fetch(conn, factory)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Qiymatlarning o'zi (int, str) ikkala usulda bir xil
+    del result
+    return (after - before) / rows
+
+def main():
+    """Asosiy funksiya"""
+    args = parse_args()
+    conn = make_connection(args.rows)
+    methods = (
+        ('sqlite3.Row', sqlite3.Row, access_row),
+        ('Chat (model)', Chat.from_row, access_model),
+    )
+
+    print(f"{args.rows} qator, {args.repeat} takrordan eng yaxshisi\n")
+    print(f"{'usul':<14} {'yaratish ns/qator':>18} {'murojaat ns/qator':>18} {'bayt/qator':>11}")
+    for name, factory, access in methods:
+        create = best_of(args.repeat, fetch, conn, factory)
+        rows = fetch(conn, factory)
+        read = best_of(args.repeat, access, rows)
+        size = bytes_per_row(conn, factory, args.rows)
+        print(
+            f"{name:<14} {create / args.rows * 1e9:>18.0f} "
+            f"{read / args.rows * 1e9:>18.0f} {size:>11.0f}"
+        )
+
+    conn.close()
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
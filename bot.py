@@ -4,10 +4,12 @@ Sevishganlar Chat Boti
 Professional versiya
 """
 
+import argparse
 import logging
 import asyncio
 import signal
 import sys
+import time
 from datetime import datetime
 
 from telegram.ext import (
@@ -20,54 +22,106 @@ from telegram.ext import (
 
 from config import Config
 from database import db
+from admission import update_queue
+from expiry import invitation_expiry
+from backup import backup_manager
+from journal import update_journal, JournaledApplication
+from transport import bot_transport
+from lagmonitor import loop_watchdog
+from instance import instance_lock
+from tracing import tracer
 import handlers
 
-# Log sozlamalari
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+def setup_logging():
+    """Log sozlamalari (faqat botni ishga tushirganda)"""
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO,
+        handlers=[
+            logging.FileHandler('bot.log', encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+
 class SevishganlarBot:
     def __init__(self):
         self.application = None
         self.is_running = False
+        self._stop_event = None
+        
+    @staticmethod
+    def register_handlers(application):
+        """Barcha handlerlarni qo'shadi"""
+        # Command handlerlar
+        application.add_handler(CommandHandler("start", handlers.start_command))
+        application.add_handler(CommandHandler("help", handlers.help_command))
+        application.add_handler(CommandHandler("end", handlers.end_command))
+        application.add_handler(CommandHandler("history", handlers.history_command))
+        
+        # Admin commandlar
+        application.add_handler(CommandHandler("stat", handlers.admin_stat))
+        application.add_handler(CommandHandler("users", handlers.admin_users))
+        application.add_handler(CommandHandler("chats", handlers.admin_chats))
+        application.add_handler(CommandHandler("search", handlers.admin_search))
+        application.add_handler(CommandHandler("analytics", handlers.admin_analytics))
+        application.add_handler(CommandHandler("broadcast", handlers.admin_broadcast))
+        application.add_handler(CommandHandler("cleanup", handlers.admin_cleanup))
+        application.add_handler(CommandHandler("backup", handlers.admin_backup))
+        application.add_handler(CommandHandler("profile", handlers.admin_profile))
         
-    async def start(self):
-        """Botni ishga tushiradi"""
+        # Callback query handler
+        application.add_handler(CallbackQueryHandler(handlers.handle_callback_query))
+        
+        # Message handler (tahrirlar alohida)
+        application.add_handler(MessageHandler(
+            filters.UpdateType.MESSAGE & ~filters.COMMAND,
+            handlers.handle_message
+        ))
+        application.add_handler(MessageHandler(
+            filters.UpdateType.EDITED_MESSAGE,
+            handlers.handle_edited_message
+        ))
+    
+    async def start(self, handoff=False):
+        """Botni ishga tushiradi va to'xtash signalini kutadi"""
+        started = time.perf_counter()
+        self._stop_event = asyncio.Event()
         try:
-            # Botni yaratish
-            self.application = Application.builder().token(Config.BOT_TOKEN).build()
+            # Database (import paytida emas, shu yerda ochiladi)
+            if not db.open(warm_up=Config.DB_WARMUP):
+                raise RuntimeError("Database ni ochib bo'lmadi")
+            db_ready = time.perf_counter()
+            
+            # Botni yaratish (polling va yuborish uchun alohida HTTP poollar)
+            builder = (
+                Application.builder()
+                .token(Config.BOT_TOKEN)
+                .application_class(JournaledApplication)
+                .update_queue(update_queue)
+            )
+            self.application = bot_transport.configure(builder).build()
             
             # ========== HANDLERLARNI QO'SHISH ==========
             
-            # Command handlerlar
-            self.application.add_handler(CommandHandler("start", handlers.start_command))
-            self.application.add_handler(CommandHandler("help", handlers.help_command))
-            self.application.add_handler(CommandHandler("end", handlers.end_command))
+            self.register_handlers(self.application)
             
-            # Admin commandlar
-            self.application.add_handler(CommandHandler("stat", handlers.admin_stat))
-            self.application.add_handler(CommandHandler("users", handlers.admin_users))
-            self.application.add_handler(CommandHandler("chats", handlers.admin_chats))
-            self.application.add_handler(CommandHandler("broadcast", handlers.admin_broadcast))
-            self.application.add_handler(CommandHandler("cleanup", handlers.admin_cleanup))
+            # ========== BOTNI ISHGA TUSHIRISH ==========
             
-            # Callback query handler
-            self.application.add_handler(CallbackQueryHandler(handlers.handle_callback_query))
+            # Handoff da hamma narsa eski nusxa to'xtashidan oldin tayyorlanadi
+            await self.application.initialize()
+            self.install_signal_handlers()
             
-            # Message handler
-            self.application.add_handler(MessageHandler(
-                filters.ALL & ~filters.COMMAND,
-                handlers.handle_message
-            ))
+            # Faqat bitta nusxa polling qiladi (handoff da eskisi bo'shatguncha kutamiz)
+            if not await instance_lock.acquire(handoff=handoff):
+                raise RuntimeError("Nusxa qulfini olib bo'lmadi")
+            locked = time.perf_counter()
             
-            # ========== BOTNI ISHGA TUSHIRISH ==========
+            # Update jurnali (navbatdan oldin yoziladi)
+            update_journal.open()
+            update_queue.seed(update_journal.recent_update_ids(update_queue.dedup_size))
+            tracer.open()
             
             self.is_running = True
             
@@ -75,14 +129,8 @@ class SevishganlarBot:
             logger.info("=" * 50)
             logger.info("🤖 SEVISHGANLAR CHAT BOTI ISHGA TUSHDI")
             logger.info("=" * 50)
-            
-            try:
-                bot_info = await self.application.bot.get_me()
-                logger.info(f"📍 Bot username: @{bot_info.username}")
-                logger.info(f"🆔 Bot ID: {bot_info.id}")
-            except:
-                logger.warning("⚠️ Bot ma'lumotlarini olishda xatolik")
-            
+            logger.info(f"📍 Bot username: @{self.application.bot.username}")
+            logger.info(f"🆔 Bot ID: {self.application.bot.id}")
             logger.info(f"📊 Database: {Config.DATABASE}")
             logger.info(f"👑 Adminlar: {Config.ADMINS}")
             logger.info(f"⏰ Vaqt: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -90,51 +138,131 @@ class SevishganlarBot:
             logger.info("⏹️  To'xtatish uchun Ctrl+C")
             logger.info("=" * 50)
             
-            # Signal handlerlar
-            signal.signal(signal.SIGINT, self.signal_handler)
-            signal.signal(signal.SIGTERM, self.signal_handler)
+            # Oldingi jarayonda tugallanmay qolgan updatelar
+            await self.replay_journal()
             
-            # Botni ishga tushirish
-            await self.application.initialize()
             await self.application.start()
             await self.application.updater.start_polling()
             
-            # Asosiy loop
-            while self.is_running:
-                await asyncio.sleep(1)
+            # Pending takliflar muddatini kuzatish
+            await invitation_expiry.start(self.application.bot)
+            
+            # Rejali backup
+            await backup_manager.start()
+            
+            # Event loop bloklanishini kuzatish
+            await loop_watchdog.start()
+            
+            logger.info(
+                f"⏱️ Ishga tushish: {(time.perf_counter() - started) * 1000:.0f}ms "
+                f"(database {(db_ready - started) * 1000:.0f}ms, "
+                f"qulfdan pollinggacha {(time.perf_counter() - locked) * 1000:.0f}ms)"
+            )
+            
+            # Signal kelguncha kutamiz
+            await self._stop_event.wait()
                 
-        except KeyboardInterrupt:
-            logger.info("🛑 Bot to'xtatildi (KeyboardInterrupt)")
         except Exception as e:
             logger.error(f"❌ Xatolik: {e}", exc_info=True)
         finally:
             await self.stop()
     
-    def signal_handler(self, signum, frame):
-        """Signal handler"""
-        logger.info(f"📶 Signal qabul qilindi: {signum}")
+    async def replay_journal(self):
+        """Jurnaldagi checkpoint dan keyingi updatelarni qayta ishlaydi"""
+        pending = update_journal.pending_updates(self.application.bot)
+        if not pending:
+            return
+        
+        logger.info(f"♻️ Jurnaldan tiklanmoqda: {len(pending)} ta update")
+        for update in pending:
+            # Telegram qayta yuborsa takror ishlanmasin
+            update_queue.remember(update.update_id)
+            await self.application.process_update(update)
+    
+    def install_signal_handlers(self):
+        """SIGINT/SIGTERM to'xtash hodisasini o'rnatadi"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.request_stop, sig)
+            except NotImplementedError:
+                # Windows: add_signal_handler yo'q
+                signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(
+                    self.request_stop, signum
+                ))
+    
+    def request_stop(self, signum=None):
+        """To'xtashni boshlaydi (signal yoki handoff)"""
+        if signum is not None:
+            logger.info(f"📶 Signal qabul qilindi: {signum}")
         self.is_running = False
+        self._stop_event.set()
+    
+    async def confirm_offset(self):
+        """Shu jarayonda olingan updatelarni Telegramga tasdiqlaydi.
+        
+        Aks holda oxirgi olingan partiya keyingi nusxaga qayta keladi.
+        Jurnaldagi eng katta id emas, haqiqatda olingan oxirgi id ishlatiladi:
+        ketma-ketlik qayta boshlansa ham yangi updatelar tashlab yuborilmaydi.
+        """
+        last_id = update_queue.last_received_id
+        if last_id is None:
+            return
+        try:
+            await self.application.bot.get_updates(offset=last_id + 1, limit=1, timeout=0)
+            logger.info(f"Offset saqlandi: {last_id + 1}")
+        except Exception as e:
+            logger.warning(f"Offsetni tasdiqlab bo'lmadi: {e}")
     
     async def stop(self):
-        """Botni to'xtatadi"""
+        """Yangi updatelarni to'xtatib, boshlanganlarini tugatadi va yopadi"""
+        started = time.perf_counter()
         try:
-            if self.application:
-                if self.application.updater:
-                    await self.application.updater.stop()
-                await self.application.stop()
-                await self.application.shutdown()
+            application = self.application
+            if application and application.updater and application.updater.running:
+                await application.updater.stop()
+            
+            # Navbatdagi va ishlanayotgan updatelar (deadline bilan)
+            if application and application.running:
+                try:
+                    await asyncio.wait_for(application.stop(), Config.DRAIN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"⌛ {Config.DRAIN_TIMEOUT}s da tugamadi, navbatda "
+                        f"{update_queue.qsize()} ta update - keyingi ishga tushishda jurnaldan"
+                    )
             
-            # Databaseni yopish
+            await loop_watchdog.stop()
+            await invitation_expiry.stop()
+            await backup_manager.stop()
+            
+            if application:
+                if update_journal.is_open:
+                    await self.confirm_offset()
+                await application.shutdown()
+            
+            # Jurnal va databaseni yopish, keyin yangi nusxaga yo'l beramiz
+            update_journal.close()
+            tracer.close()
             db.close()
+            instance_lock.release()
             
-            logger.info("✅ Bot to'liq to'xtatildi")
+            logger.info(f"✅ Bot to'liq to'xtatildi ({time.perf_counter() - started:.1f}s)")
             logger.info("=" * 50)
             
         except Exception as e:
             logger.error(f"Botni to'xtatishda xato: {e}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sevishganlar Chat Boti")
+    parser.add_argument('--handoff', action='store_true',
+                        help="ishlayotgan nusxani to'xtatib, uning o'rnini egallash")
+    return parser.parse_args()
+
 def main():
     """Asosiy funksiya"""
+    args = parse_args()
+    setup_logging()
     bot = SevishganlarBot()
     
     # Event loop
@@ -142,7 +270,7 @@ def main():
     asyncio.set_event_loop(loop)
     
     try:
-        loop.run_until_complete(bot.start())
+        loop.run_until_complete(bot.start(handoff=args.handoff))
     finally:
         loop.close()
         sys.exit(0)
@@ -0,0 +1,59 @@
+import logging
+import time
+from telegram.error import BadRequest, Forbidden
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def is_unreachable_error(error):
+    """Qabul qiluvchi botni bloklagan yoki chat mavjud emas"""
+    if isinstance(error, Forbidden):
+        return True
+    return isinstance(error, BadRequest) and 'chat not found' in error.message.lower()
+
+class DeliveryBreaker:
+    """Har bir qabul qiluvchi uchun circuit breaker.
+
+    Forbidden/"Chat not found" dan keyin shu foydalanuvchiga yuborish
+    cool-down davomida umuman urinilmaydi. Cool-down tugagach bitta sinov
+    yuboriladi; muvaffaqiyatli bo'lsa holat tozalanadi. Ketma-ket
+    `max_failures` marta xato bo'lsa, chaqiruvchi chatni tugatadi.
+    """
+
+    def __init__(self, cooldown=None, max_failures=None):
+        self.cooldown = cooldown or Config.BREAKER_COOLDOWN
+        self.max_failures = max_failures or Config.BREAKER_MAX_FAILURES
+        # user_id -> (ketma-ket xatolar, qachongacha yopiq)
+        self._state = {}
+        self.short_circuited = 0
+
+    def is_open(self, user_id):
+        """Cool-down davom etyapti - yuborishga urinmaslik kerak"""
+        state = self._state.get(user_id)
+        if state is None or time.monotonic() >= state[1]:
+            return False
+        self.short_circuited += 1
+        return True
+
+    def record_failure(self, user_id):
+        """Yetkazib bo'lmadi - ketma-ket xatolar sonini qaytaradi"""
+        failures = self._state.get(user_id, (0, 0))[0] + 1
+        self._state[user_id] = (failures, time.monotonic() + self.cooldown)
+        logger.warning(f"Foydalanuvchiga yetkazib bo'lmadi: {user_id} ({failures}-marta)")
+        return failures
+
+    def reset(self, user_id):
+        """Yetkazildi yoki foydalanuvchi botga qaytdi"""
+        self._state.pop(user_id, None)
+
+    def get_stats(self):
+        """Monitoring uchun: kuzatilayotgan va tejalgan yuborishlar"""
+        now = time.monotonic()
+        return {
+            'tracked': len(self._state),
+            'open': sum(1 for _, until in self._state.values() if now < until),
+            'short_circuited': self.short_circuited,
+        }
+
+# Global obyekt
+delivery_breaker = DeliveryBreaker()
@@ -9,6 +9,9 @@ class Config:
     
     # Database fayl
     DATABASE = "sevishganlar.db"
+    DB_JOURNAL_MODE = "WAL"  # yozish va o'qish bir-birini bloklamaydi
+    DB_SYNCHRONOUS = "NORMAL"  # WAL da fsync faqat checkpoint da
+    DB_BUSY_TIMEOUT = 5  # sekund, boshqa ulanish yozayotgan bo'lsa kutish
     
     # Admin ID lar (yangi qo'shishingiz mumkin)
     ADMINS = [7917659197]  # O'zingizning ID ni kiriting
@@ -17,6 +20,80 @@ class Config:
     MAX_MESSAGE_LENGTH = 4000
     REQUEST_TIMEOUT = 60  # sekund
     CLEANUP_INTERVAL = 3600  # 1 soat
+    USER_CACHE_SIZE = 10000  # xotirada saqlanadigan profillar soni
+    DB_WARMUP = True  # ishga tushganda faol profillarni keshga yuklash
+    HISTORY_PAGE_SIZE = 10  # /history sahifasidagi xabarlar soni
+    HISTORY_PREVIEW_LENGTH = 300  # tarixda ko'rsatiladigan matn uzunligi
+    SEARCH_RESULTS_LIMIT = 20  # /search natijalari soni
+    
+    # Backup (bot ishlayotganda SQLite backup API orqali)
+    BACKUP_DIR = "backups"
+    BACKUP_KEEP = 7  # saqlanadigan nusxalar soni
+    BACKUP_INTERVAL = 24 * 3600  # sekund, 0 - faqat /backup orqali
+    BACKUP_PAGES_PER_STEP = 256  # WAL bo'lmaganda: har qadamda nusxalanadigan sahifalar
+    BACKUP_STEP_SLEEP = 0.005  # qadamlar orasidagi tanaffus (sekund)
+    
+    # Update jurnali (qulashdan tiklash va replay)
+    JOURNAL_DIR = "journal"
+    JOURNAL_SEGMENT_SIZE = 16 * 1024 * 1024  # oldindan ajratiladigan hajm
+    JOURNAL_ROTATE_SIZE = 8 * 1024 * 1024  # shundan katta segment arxivlanadi
+    JOURNAL_KEEP = 48  # saqlanadigan arxiv segmentlar soni
+    
+    # Flooddan himoya: (sekundiga token, maksimal token)
+    RATE_LIMITS = {
+        "message": (1.0, 20),     # relay xabarlar
+        "invite": (1 / 30, 3),    # taklif yuborish urinishlari
+        "admin": (0.5, 10),       # admin komandalar
+    }
+    RATE_LIMIT_IDLE_TTL = 600  # ishlatilmagan bucketlar shu vaqtdan keyin o'chiriladi
+    RATE_LIMIT_NOTICE_INTERVAL = 30  # "sekinroq" ogohlantirishlari orasidagi vaqt (sekund)
+    
+    # Bot API HTTP ulanishlari (polling va yuborish alohida poolda)
+    HTTP_SEND_POOL_SIZE = 16  # relay va broadcast uchun bir vaqtdagi so'rovlar
+    HTTP_POLL_POOL_SIZE = 1  # getUpdates uchun
+    HTTP_KEEPALIVE_EXPIRY = 30  # bo'sh ulanish shuncha sekund ochiq qoladi
+    HTTP_CONNECT_TIMEOUT = 5.0
+    HTTP_READ_TIMEOUT = 10.0
+    HTTP_POLL_READ_TIMEOUT = 10.0  # long-poll timeout ga qo'shiladi
+    HTTP_WRITE_TIMEOUT = 20.0  # media yuklash uchun kattaroq
+    HTTP_POOL_TIMEOUT = 5.0  # bo'sh ulanish kutish chegarasi
+    HTTP_VERSION = os.getenv("HTTP_VERSION", "1.1")  # "2" uchun httpx[http2] kerak
+    BROADCAST_CONCURRENCY = 8  # broadcast da parallel yuborishlar
+    
+    # Botni bloklagan qabul qiluvchilar (circuit breaker)
+    BREAKER_COOLDOWN = 300  # sekund, bu vaqtda yuborishga urinilmaydi
+    BREAKER_MAX_FAILURES = 3  # shuncha ketma-ket xatodan keyin chat tugatiladi
+    
+    # Tahrir va javoblar uchun xabar bog'lanishlari
+    RELAY_MAP_PER_CHAT = 1000  # har bir chat uchun keshda (va bazada) saqlanadigan xabarlar
+    
+    # Event loop bloklanishini kuzatish
+    WATCHDOG_INTERVAL = 0.1  # sekund, 0 - o'chirilgan
+    WATCHDOG_THRESHOLD = 0.25  # shundan uzoq bloklanish logga yoziladi (stek bilan)
+    WATCHDOG_SAMPLES = 3000  # persentillar uchun oxirgi o'lchovlar (~5 daqiqa)
+    
+    # Update tracing (OTLP/JSON, aylanuvchi fayl)
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))  # 0 - o'chirilgan
+    TRACE_FILE = "traces.jsonl"
+    TRACE_MAX_BYTES = 10 * 1024 * 1024
+    TRACE_BACKUP_COUNT = 5
+    
+    # /profile (statistik profiler)
+    PROFILE_INTERVAL = 0.005  # namunalar orasidagi vaqt (sekund)
+    PROFILE_DEFAULT_SECONDS = 10
+    PROFILE_MAX_SECONDS = 120
+    PROFILE_TOP_N = 15  # xulosadagi funksiyalar soni
+    
+    # To'xtatish va handoff (python bot.py --handoff)
+    DRAIN_TIMEOUT = 20  # sekund, navbatdagi updatelarni tugatish chegarasi
+    HANDOFF_TIMEOUT = 40  # yangi nusxa eskisining to'xtashini kutadi
+    PID_FILE = "bot.pid"  # nusxa qulfi
+    
+    # Kiruvchi update navbati
+    UPDATE_QUEUE_SIZE = 1000  # navbat to'lsa polling kutadi
+    UPDATE_STALE_AFTER = 30  # sekund, shundan eski /start va yordam tashlanadi
+    SHEDDABLE_COMMANDS = ("start", "help")
+    SHEDDABLE_CALLBACKS = ("help",)
     
     # Xabarlar
     MESSAGES = {
@@ -29,11 +106,28 @@ class Config:
         "user_busy": "❌ Bu foydalanuvchi allaqachon boshqa chatda!",
         "invite_sent": "✅ Taklif yuborildi!\n👤 Kimga: {name}\n🆔 ID: `{id}`",
         "invite_received": "💌 *Yangi chat taklifi!*\n\n{name} sizni chatga taklif qilmoqda!",
+        "invite_expired": "⌛ Taklif muddati tugadi.",
         "chat_started": "✅ Chat ochildi! 💑\nEndi bir-biringizga xabar yuborishingiz mumkin.",
         "chat_ended": "🔚 Chat tugatildi",
+        "partner_ended": "🔚 *Chat tugatildi*\n\nSherigingiz chatni tugatdi.",
+        "invite_details": "👤 *Taklif qiluvchi:* {name}\n🆔 *ID:* `{id}`\n\nChatni qabul qilasizmi?",
+        "invite_accepted": "🎉 *{name} chatni qabul qildi!*",
+        "partner_unreachable": (
+            "❌ *Xatolik!*\n\n"
+            "*Sabablar:*\n"
+            "1. ID noto'g'ri\n"
+            "2. Foydalanuvchi botni bloklagan\n"
+            "3. Foydalanuvchi botga /start bosmagan\n\n"
+            "Bot: @{bot_username}"
+        ),
+        "idle": "🤖 *Sevishganlar Chat Boti*\n\n💑 Chat boshlash uchun /start bosing\n❓ Yordam uchun /help",
         "no_active_chat": "Sizda faol chat yo'q",
         "message_sent": "✅ Xabar yuborildi",
         "message_not_sent": "❌ Xabar yuborilmadi",
+        "slow_down": "⏳ Juda tez! Biroz kutib, qayta urinib ko'ring.",
+        "invite_slow_down": "⏳ Takliflar juda ko'p. Bir necha daqiqadan keyin ID ni qayta yuboring.",
+        "partner_blocked": "🚫 Sherigingiz botni bloklagan, xabar yetkazilmadi.",
+        "partner_gone": "🔚 *Chat tugatildi*\n\nSherigingiz botni bloklagani uchun xabarlar yetkazilmayapti.",
         "help_text": """
 🤖 *Sevishganlar Chat Boti - Yordam*
 
@@ -50,15 +144,20 @@ class Config:
 *Muhim eslatmalar:*
 • Faqat 2 kishi chat qilishi mumkin
 • Chatni istalgan vaqt /end bilan tugatishingiz mumkin
+• /history - chat tarixini ko'rish
 • Barcha xabarlar maxfiy saqlanadi
 """,
         "admin_help": """
 👑 *Admin Paneli*
 
 /stat - Bot statistikasi
+/analytics - Trendlar (kunlik yoki `/analytics 24h`)
 /users - Barcha foydalanuvchilar
 /chats - Faol chatlar
+/search - Xabarlardan qidirish
 /broadcast - Xabar yuborish
 /cleanup - Eski ma'lumotlarni tozalash
+/backup - Bazaning nusxasini olish
+/profile - Statistik profil (`/profile 30`)
 """
     }
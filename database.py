@@ -1,16 +1,66 @@
 import sqlite3
 import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from config import Config
+from models import User, Chat, Invitation, Message
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 class Database:
+    # Sxema o'zgarganda oshiriladi (PRAGMA user_version da saqlanadi)
+    SCHEMA_VERSION = 4
+    
     def __init__(self):
         self.conn = None
         self.cursor = None
+        self.fts_enabled = False
+        # LRU kesh: user_id -> (username, first_name, last_name)
+        self._profiles = OrderedDict()
+    
+    @property
+    def is_open(self):
+        return self.conn is not None
+    
+    def open(self, warm_up=False):
+        """Ulanadi, kerak bo'lsa sxemani yangilaydi va keshni isitadi.
+        
+        Import paytida hech narsa qilinmaydi - bot (yoki CLI) o'zi chaqiradi.
+        """
+        if self.is_open:
+            return True
+        started = time.perf_counter()
         self.connect()
-        self.create_tables()
+        if not self.is_open:
+            return False
+        
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            # Sxema yangi: DDL ni o'tkazib yuboramiz
+            if version > self.SCHEMA_VERSION:
+                logger.warning(f"Baza sxemasi (v{version}) koddagidan yangiroq")
+            self.fts_enabled = self._table_exists('messages_fts')
+            if not self.fts_enabled:
+                # Oldingi safar FTS5 yaratilmagan bo'lsa, yana urinib ko'ramiz
+                self.create_search_index()
+        elif self.create_tables():
+            self.conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+            self.conn.commit()
+        else:
+            logger.error("Database sxemasini yaratib bo'lmadi")
+            self.close()
+            return False
+        
+        warmed = self.warm_up() if warm_up else 0
+        state = "o'zgarmagan" if version >= self.SCHEMA_VERSION else f"v{version} dan yangilandi"
+        logger.info(
+            f"Database tayyor: sxema v{self.SCHEMA_VERSION} ({state}), "
+            f"keshga {warmed} ta profil, {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return True
     
     def connect(self):
         """Database ga ulanadi"""
@@ -18,7 +68,13 @@ class Database:
             self.conn = sqlite3.connect(Config.DATABASE, check_same_thread=False)
             self.conn.row_factory = sqlite3.Row
             self.cursor = self.conn.cursor()
-            logger.info("Database ga ulandi")
+            
+            # WAL: o'quvchilar (backup, CLI) yozuvchini bloklamaydi, commit fsync siz
+            self.cursor.execute(f'PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT * 1000)}')
+            self.cursor.execute(f'PRAGMA journal_mode = {Config.DB_JOURNAL_MODE}')
+            journal_mode = self.cursor.fetchone()[0]
+            self.cursor.execute(f'PRAGMA synchronous = {Config.DB_SYNCHRONOUS}')
+            logger.info(f"Database ga ulandi (journal_mode={journal_mode})")
         except Exception as e:
             logger.error(f"Database ga ulanishda xato: {e}")
     
@@ -33,7 +89,8 @@ class Database:
                     first_name TEXT,
                     last_name TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    unreachable_at TIMESTAMP -- botni bloklagan (yetkazib bo'lmagan) vaqt
                 )
             ''')
             
@@ -59,6 +116,7 @@ class Database:
                     sender_id INTEGER,
                     message_type TEXT,
                     content TEXT,
+                    file_id TEXT,
                     sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (chat_id) REFERENCES chats(chat_id),
                     FOREIGN KEY (sender_id) REFERENCES users(user_id)
@@ -71,67 +129,430 @@ class Database:
                     invitation_id INTEGER PRIMARY KEY AUTOINCREMENT,
                     sender_id INTEGER,
                     receiver_id INTEGER,
-                    status TEXT DEFAULT 'pending', -- pending, accepted, rejected
+                    status TEXT DEFAULT 'pending', -- pending, accepted, rejected, cancelled, expired
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     responded_at TIMESTAMP,
+                    message_id INTEGER, -- qabul qiluvchiga yuborilgan taklif xabari
                     FOREIGN KEY (sender_id) REFERENCES users(user_id),
                     FOREIGN KEY (receiver_id) REFERENCES users(user_id)
                 )
             ''')
             
+            # Eski bazalar uchun yangi ustunlar
+            self._ensure_column('invitations', 'message_id', 'INTEGER')
+            self._ensure_column('messages', 'file_id', 'TEXT')
+            self._ensure_column('users', 'unreachable_at', 'TIMESTAMP')
+            
+            # Chat tarixini sahifalash uchun (keyset pagination)
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_messages_chat
+                ON messages (chat_id, message_id)
+            ''')
+            
+            # Yuborilgan xabar -> sherikka ketgan nusxa (tahrir va javoblar uchun)
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS relay_map (
+                    user_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL, -- foydalanuvchi chatidagi Telegram message_id
+                    partner_message_id INTEGER NOT NULL, -- sherik chatidagi nusxasi
+                    chat_id INTEGER NOT NULL,
+                    db_message_id INTEGER, -- messages jadvalidagi yozuv
+                    PRIMARY KEY (user_id, message_id)
+                ) WITHOUT ROWID
+            ''')
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_relay_map_chat
+                ON relay_map (chat_id, db_message_id)
+            ''')
+            
+            # Eski bazalardagi takroriy pending takliflarni tozalaymiz
+            # (aks holda unique index yaratilmaydi)
+            self.cursor.execute('''
+                UPDATE invitations SET status = 'cancelled'
+                WHERE status = 'pending' AND invitation_id NOT IN (
+                    SELECT MAX(invitation_id) FROM invitations
+                    WHERE status = 'pending'
+                    GROUP BY sender_id, receiver_id
+                )
+            ''')
+            
+            # Bir juftlik uchun faqat bitta pending taklif
+            self.cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_invitations_pending
+                ON invitations (sender_id, receiver_id)
+                WHERE status = 'pending'
+            ''')
+            
+            # Eski bazalardagi takroriy faol chatlarni yopamiz
+            # (ended_at end_chat dagi kabi mahalliy vaqtda)
+            for column in ('user1_id', 'user2_id'):
+                self.cursor.execute(f'''
+                    UPDATE chats SET is_active = 0, ended_at = ?
+                    WHERE is_active = 1 AND chat_id NOT IN (
+                        SELECT MAX(chat_id) FROM chats
+                        WHERE is_active = 1
+                        GROUP BY {column}
+                    )
+                ''', (datetime.now(),))
+            
+            # Foydalanuvchi bir vaqtda faqat bitta faol chatda bo'la oladi
+            self.cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_chats_active_user1
+                ON chats (user1_id) WHERE is_active = 1
+            ''')
+            self.cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_chats_active_user2
+                ON chats (user2_id) WHERE is_active = 1
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_chats_one_active
+                BEFORE INSERT ON chats
+                WHEN NEW.is_active = 1 AND EXISTS (
+                    SELECT 1 FROM chats
+                    WHERE is_active = 1
+                    AND (user1_id IN (NEW.user1_id, NEW.user2_id)
+                         OR user2_id IN (NEW.user1_id, NEW.user2_id))
+                )
+                BEGIN
+                    SELECT RAISE(ABORT, 'user already in active chat');
+                END
+            ''')
+            
             self.conn.commit()
             logger.info("Jadvallar yaratildi/yangilandi")
             
         except Exception as e:
             logger.error(f"Jadvallarni yaratishda xato: {e}")
+            return False
+        
+        # FTS5 bo'lmasa ham baza ishlaydi (faqat qidiruv o'chadi)
+        self.create_search_index()
+        return self.create_rollup_tables()
+    
+    def _table_exists(self, name):
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        )
+        return self.cursor.fetchone() is not None
+    
+    def warm_up(self):
+        """Oxirgi faol foydalanuvchilar profillarini LRU keshga yuklaydi"""
+        try:
+            self.cursor.execute('''
+                SELECT user_id, username, first_name, last_name FROM users
+                ORDER BY last_active DESC LIMIT ?
+            ''', (Config.USER_CACHE_SIZE,))
+            rows = self.cursor.fetchall()
+            # Eng faollari keshning "yangi" uchida qolsin
+            for row in reversed(rows):
+                self._cache_profile(
+                    row['user_id'], (row['username'], row['first_name'], row['last_name'])
+                )
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Keshni isitishda xato: {e}")
+            return 0
+    
+    def create_search_index(self):
+        """Xabarlar uchun FTS5 indeksini yaratadi (triggerlar bilan sinxron)"""
+        self.fts_enabled = False
+        try:
+            is_new = not self._table_exists('messages_fts')
+            
+            self.cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content,
+                    content='messages',
+                    content_rowid='message_id'
+                )
+            ''')
+            
+            # add_message va cleanup_old_data o'zgarishlari avtomatik aks etadi
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_messages_fts_insert
+                AFTER INSERT ON messages BEGIN
+                    INSERT INTO messages_fts (rowid, content)
+                    VALUES (NEW.message_id, NEW.content);
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_messages_fts_delete
+                AFTER DELETE ON messages BEGIN
+                    INSERT INTO messages_fts (messages_fts, rowid, content)
+                    VALUES ('delete', OLD.message_id, OLD.content);
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_messages_fts_update
+                AFTER UPDATE OF content ON messages BEGIN
+                    INSERT INTO messages_fts (messages_fts, rowid, content)
+                    VALUES ('delete', OLD.message_id, OLD.content);
+                    INSERT INTO messages_fts (rowid, content)
+                    VALUES (NEW.message_id, NEW.content);
+                END
+            ''')
+            self.conn.commit()
+            self.fts_enabled = True
+            
+            # Mavjud bazada indeks yangi yaratilgan bo'lsa, eski xabarlarni qo'shamiz
+            if is_new:
+                self.rebuild_search_index()
+                
+        except Exception as e:
+            # Yarim yaratilgan trigger xabar yozishni buzmasin
+            self.conn.rollback()
+            logger.warning(f"FTS5 indeksini yaratib bo'lmadi (qidiruv o'chirilgan): {e}")
+    
+    def create_rollup_tables(self):
+        """Analitika uchun soatlik/kunlik agregat jadvallar"""
+        try:
+            for table in ('stats_hourly', 'stats_daily'):
+                self.cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        bucket TEXT NOT NULL, -- UTC: 'YYYY-MM-DD HH:00' yoki 'YYYY-MM-DD'
+                        metric TEXT NOT NULL,
+                        value INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (bucket, metric)
+                    ) WITHOUT ROWID
+                ''')
+            
+            # Har bir manba qayergacha yig'ilganini saqlaydi (high-water mark)
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rollup_state (
+                    metric TEXT PRIMARY KEY,
+                    watermark
+                )
+            ''')
+            
+            # Chat tugashi va taklif qabul qilinishi mavjud qatorni yangilaydi,
+            # vaqti esa mahalliy (DST da takrorlanadi). Shuning uchun ular
+            # trigger orqali monoton event_id li jurnalga yoziladi.
+            is_new = not self._table_exists('rollup_events')
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rollup_events (
+                    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    metric TEXT NOT NULL,
+                    happened_at TIMESTAMP NOT NULL -- mahalliy vaqt
+                )
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS rollup_chat_ended
+                AFTER UPDATE OF is_active ON chats
+                WHEN OLD.is_active = 1 AND NEW.is_active = 0
+                BEGIN
+                    INSERT INTO rollup_events (metric, happened_at)
+                    VALUES ('chats_ended', COALESCE(NEW.ended_at, datetime('now', 'localtime')));
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS rollup_invitation_accepted
+                AFTER UPDATE OF status ON invitations
+                WHEN OLD.status != 'accepted' AND NEW.status = 'accepted'
+                BEGIN
+                    INSERT INTO rollup_events (metric, happened_at)
+                    VALUES ('invitations_accepted', COALESCE(NEW.responded_at, datetime('now', 'localtime')));
+                END
+            ''')
+            
+            if is_new:
+                # Eski (vaqt bo'yicha) watermarkdan keyingi qatorlarni jurnalga
+                # ko'chiramiz va watermarkni event_id ga o'tkazamiz
+                for metric, table, column, condition in (
+                    ('chats_ended', 'chats', 'ended_at', 'is_active = 0'),
+                    ('invitations_accepted', 'invitations', 'responded_at', "status = 'accepted'"),
+                ):
+                    self.cursor.execute(f'''
+                        INSERT INTO rollup_events (metric, happened_at)
+                        SELECT ?, {column} FROM {table}
+                        WHERE {condition} AND {column} IS NOT NULL
+                        AND {column} > COALESCE(
+                            (SELECT watermark FROM rollup_state WHERE metric = ?), ''
+                        )
+                        ORDER BY {column}
+                    ''', (metric, metric))
+                    self.cursor.execute('DELETE FROM rollup_state WHERE metric = ?', (metric,))
+            
+            self.conn.commit()
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Agregat jadvallarni yaratishda xato: {e}")
+            return False
+    
+    def rebuild_search_index(self):
+        """FTS5 indeksini messages jadvalidan qaytadan quradi"""
+        try:
+            self.cursor.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+            self.conn.commit()
+            logger.info("Qidiruv indeksi qayta qurildi")
+            return True
+        except Exception as e:
+            logger.error(f"Qidiruv indeksini qurishda xato: {e}")
+            return False
+    
+    def _ensure_column(self, table, column, definition):
+        """Jadvalda ustun bo'lmasa qo'shadi (oddiy migratsiya)"""
+        self.cursor.execute(f'PRAGMA table_info({table})')
+        if column not in [row['name'] for row in self.cursor.fetchall()]:
+            self.cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    
+    def _select(self, model, clause='', params=()):
+        """Model ustunlarini tanlaydi - natija model obyektlari (sqlite3.Row emas)"""
+        cursor = self.conn.cursor()
+        cursor.row_factory = model.from_row
+        cursor.execute(f'SELECT {model.COLUMNS} FROM {model.TABLE} {clause}', params)
+        return cursor
+    
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE bilan bitta tranzaksiya (xatoda ROLLBACK)"""
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.cursor
+        except Exception:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
     
     # ========== USER OPERATIONS ==========
     
+    def _cache_profile(self, user_id, profile):
+        """Profilni LRU keshga yozadi"""
+        self._profiles[user_id] = profile
+        self._profiles.move_to_end(user_id)
+        if len(self._profiles) > Config.USER_CACHE_SIZE:
+            self._profiles.popitem(last=False)
+    
+    def _cached_profile(self, user_id):
+        """Keshdagi profil (yo'q bo'lsa None)"""
+        profile = self._profiles.get(user_id)
+        if profile is not None:
+            self._profiles.move_to_end(user_id)
+        return profile
+    
+    @tracer.traced()
     def add_user(self, user_id, username, first_name, last_name=None):
-        """Yangi foydalanuvchi qo'shadi"""
+        """Yangi foydalanuvchi qo'shadi (profil o'zgarmagan bo'lsa yozmaydi)"""
         try:
+            profile = (username, first_name, last_name)
+            
+            cached = self._cached_profile(user_id)
+            if cached is None:
+                row = self.get_user(user_id)
+                cached = self._cached_profile(user_id) if row else None
+            if cached == profile:
+                return True
+            
             self.cursor.execute('''
-                INSERT OR REPLACE INTO users 
+                INSERT INTO users 
                 (user_id, username, first_name, last_name, last_active)
                 VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    username = excluded.username,
+                    first_name = excluded.first_name,
+                    last_name = excluded.last_name,
+                    last_active = excluded.last_active
             ''', (user_id, username, first_name, last_name, datetime.now()))
             self.conn.commit()
+            self._cache_profile(user_id, profile)
             return True
         except Exception as e:
             logger.error(f"Foydalanuvchi qo'shishda xato: {e}")
             return False
     
+    @tracer.traced()
     def get_user(self, user_id):
         """Foydalanuvchini olish"""
         try:
-            self.cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-            return self.cursor.fetchone()
+            user = self._select(User, 'WHERE user_id = ?', (user_id,)).fetchone()
+            if user:
+                self._cache_profile(user_id, user.profile)
+            return user
         except Exception as e:
             logger.error(f"Foydalanuvchini olishda xato: {e}")
             return None
     
+    @tracer.traced()
+    def get_display_names(self, user_ids):
+        """Foydalanuvchi ismlari (keshdan, yo'qlari bitta so'rovda)"""
+        names = {}
+        missing = []
+        for user_id in set(user_ids):
+            profile = self._cached_profile(user_id)
+            if profile is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = profile[1]
+        
+        if missing:
+            try:
+                placeholders = ','.join('?' * len(missing))
+                self.cursor.execute(f'''
+                    SELECT user_id, username, first_name, last_name
+                    FROM users WHERE user_id IN ({placeholders})
+                ''', missing)
+                for row in self.cursor.fetchall():
+                    self._cache_profile(
+                        row['user_id'], (row['username'], row['first_name'], row['last_name'])
+                    )
+                    names[row['user_id']] = row['first_name']
+            except Exception as e:
+                logger.error(f"Ismlarni olishda xato: {e}")
+        
+        return names
+    
+    def get_display_name(self, user_id):
+        """Bitta foydalanuvchi ismi (topilmasa None)"""
+        return self.get_display_names([user_id]).get(user_id)
+    
+    @tracer.traced()
     def update_user_activity(self, user_id):
         """Foydalanuvchi faolligini yangilaydi"""
         try:
+            # Botga yozayotgan foydalanuvchi blokni olib tashlagan
             self.cursor.execute(
-                'UPDATE users SET last_active = ? WHERE user_id = ?',
+                'UPDATE users SET last_active = ?, unreachable_at = NULL WHERE user_id = ?',
                 (datetime.now(), user_id)
             )
             self.conn.commit()
         except Exception as e:
             logger.error(f"Faollikni yangilashda xato: {e}")
     
-    def get_all_users(self):
+    @tracer.traced()
+    def set_user_reachable(self, user_id, reachable=True):
+        """Foydalanuvchini yetkazib bo'ladigan/bo'lmaydigan deb belgilaydi"""
+        try:
+            if reachable:
+                self.cursor.execute('''
+                    UPDATE users SET unreachable_at = NULL
+                    WHERE user_id = ? AND unreachable_at IS NOT NULL
+                ''', (user_id,))
+            else:
+                self.cursor.execute('''
+                    UPDATE users SET unreachable_at = ?
+                    WHERE user_id = ? AND unreachable_at IS NULL
+                ''', (datetime.now(), user_id))
+            self.conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Yetkazish holatini yangilashda xato: {e}")
+            return False
+    
+    def get_all_users(self, reachable_only=False):
         """Barcha foydalanuvchilarni olish"""
         try:
-            self.cursor.execute('SELECT * FROM users ORDER BY created_at DESC')
-            return self.cursor.fetchall()
+            where = 'WHERE unreachable_at IS NULL' if reachable_only else ''
+            return self._select(User, f'{where} ORDER BY created_at DESC').fetchall()
         except Exception as e:
             logger.error(f"Barcha foydalanuvchilarni olishda xato: {e}")
             return []
     
     # ========== CHAT OPERATIONS ==========
     
+    @tracer.traced()
     def create_chat(self, user1_id, user2_id):
         """Yangi chat yaratadi"""
         try:
@@ -145,16 +566,15 @@ class Database:
             logger.error(f"Chat yaratishda xato: {e}")
             return None
     
+    @tracer.traced()
     def get_active_chat(self, user_id):
         """Foydalanuvchining faol chatini topadi"""
         try:
-            self.cursor.execute('''
-                SELECT * FROM chats 
+            return self._select(Chat, '''
                 WHERE (user1_id = ? OR user2_id = ?) 
                 AND is_active = 1
                 LIMIT 1
-            ''', (user_id, user_id))
-            return self.cursor.fetchone()
+            ''', (user_id, user_id)).fetchone()
         except Exception as e:
             logger.error(f"Faol chatni olishda xato: {e}")
             return None
@@ -162,13 +582,31 @@ class Database:
     def get_chat_partner(self, user_id):
         """Chat sherigini topadi"""
         chat = self.get_active_chat(user_id)
-        if chat:
-            if chat['user1_id'] == user_id:
-                return chat['user2_id']
-            else:
-                return chat['user1_id']
-        return None
+        return chat.partner_of(user_id) if chat else None
     
+    @tracer.traced()
+    def get_chat(self, chat_id):
+        """Chatni ID bo'yicha olish"""
+        try:
+            return self._select(Chat, 'WHERE chat_id = ?', (chat_id,)).fetchone()
+        except Exception as e:
+            logger.error(f"Chatni olishda xato: {e}")
+            return None
+    
+    @tracer.traced()
+    def get_last_chat(self, user_id):
+        """Foydalanuvchining faol yoki oxirgi tugagan chati"""
+        try:
+            return self._select(Chat, '''
+                WHERE user1_id = ? OR user2_id = ?
+                ORDER BY is_active DESC, chat_id DESC
+                LIMIT 1
+            ''', (user_id, user_id)).fetchone()
+        except Exception as e:
+            logger.error(f"Oxirgi chatni olishda xato: {e}")
+            return None
+    
+    @tracer.traced()
     def end_chat(self, chat_id):
         """Chatni tugatadi"""
         try:
@@ -177,6 +615,8 @@ class Database:
                 SET is_active = 0, ended_at = ?
                 WHERE chat_id = ?
             ''', (datetime.now(), chat_id))
+            # Tugagan chat xabarlarini endi tahrirlab ham, javob berib ham bo'lmaydi
+            self.cursor.execute('DELETE FROM relay_map WHERE chat_id = ?', (chat_id,))
             self.conn.commit()
             return True
         except Exception as e:
@@ -186,58 +626,44 @@ class Database:
     def get_all_chats(self):
         """Barcha chatlarni olish"""
         try:
-            self.cursor.execute('''
-                SELECT c.*, 
-                       u1.first_name as user1_name,
-                       u2.first_name as user2_name
-                FROM chats c
-                LEFT JOIN users u1 ON c.user1_id = u1.user_id
-                LEFT JOIN users u2 ON c.user2_id = u2.user_id
-                ORDER BY c.created_at DESC
-            ''')
-            return self.cursor.fetchall()
+            # Ismlar get_display_names orqali keshdan olinadi
+            return self._select(Chat, 'ORDER BY created_at DESC').fetchall()
         except Exception as e:
             logger.error(f"Barcha chatlarni olishda xato: {e}")
             return []
     
     # ========== INVITATION OPERATIONS ==========
     
+    @tracer.traced()
     def create_invitation(self, sender_id, receiver_id):
-        """Yangi taklif yaratadi"""
+        """Yangi taklif yaratadi va uning ID sini qaytaradi"""
         try:
-            # Avval mavjud taklifni tekshiramiz
+            # Pending juftlik uchun unique index bor - takror taklif e'tiborsiz qoldiriladi
             self.cursor.execute('''
-                SELECT * FROM invitations 
-                WHERE sender_id = ? AND receiver_id = ? 
-                AND status = 'pending'
-            ''', (sender_id, receiver_id))
-            
-            if self.cursor.fetchone():
-                return False  # Taklif allaqachon mavjud
-            
-            self.cursor.execute('''
-                INSERT INTO invitations (sender_id, receiver_id)
+                INSERT OR IGNORE INTO invitations (sender_id, receiver_id)
                 VALUES (?, ?)
             ''', (sender_id, receiver_id))
             self.conn.commit()
-            return True
+            if self.cursor.rowcount != 1:
+                return None
+            return self.cursor.lastrowid
         except Exception as e:
             logger.error(f"Taklif yaratishda xato: {e}")
-            return False
+            return None
     
+    @tracer.traced()
     def get_invitation(self, sender_id, receiver_id):
         """Taklifni olish"""
         try:
-            self.cursor.execute('''
-                SELECT * FROM invitations 
+            return self._select(Invitation, '''
                 WHERE sender_id = ? AND receiver_id = ? 
                 AND status = 'pending'
-            ''', (sender_id, receiver_id))
-            return self.cursor.fetchone()
+            ''', (sender_id, receiver_id)).fetchone()
         except Exception as e:
             logger.error(f"Taklifni olishda xato: {e}")
             return None
     
+    @tracer.traced()
     def update_invitation_status(self, sender_id, receiver_id, status):
         """Taklif holatini yangilaydi"""
         try:
@@ -253,21 +679,322 @@ class Database:
             logger.error(f"Taklif holatini yangilashda xato: {e}")
             return False
     
+    @tracer.traced()
+    def accept_invitation(self, sender_id, receiver_id):
+        """Taklifni qabul qiladi va chat yaratadi (bitta tranzaksiyada)"""
+        try:
+            with self.transaction() as cursor:
+                now = datetime.now()
+                cursor.execute('''
+                    UPDATE invitations 
+                    SET status = 'accepted', responded_at = ?
+                    WHERE sender_id = ? AND receiver_id = ? 
+                    AND status = 'pending'
+                    AND created_at > datetime('now', ?)
+                ''', (now, sender_id, receiver_id, f'-{Config.REQUEST_TIMEOUT} seconds'))
+                
+                if cursor.rowcount == 0:
+                    return None  # Taklif topilmadi, muddati o'tgan yoki javob berilgan
+                
+                # Qarama-qarshi taklif (ikkalasi bir-birini taklif qilgan bo'lsa)
+                cursor.execute('''
+                    UPDATE invitations 
+                    SET status = 'cancelled', responded_at = ?
+                    WHERE sender_id = ? AND receiver_id = ? 
+                    AND status = 'pending'
+                ''', (now, receiver_id, sender_id))
+                
+                # Ikkalasidan biri faol chatda bo'lsa trigger ABORT qiladi
+                cursor.execute('''
+                    INSERT INTO chats (user1_id, user2_id, created_at)
+                    VALUES (?, ?, ?)
+                ''', (sender_id, receiver_id, now))
+                return cursor.lastrowid
+        except sqlite3.IntegrityError as e:
+            logger.warning(f"Taklifni qabul qilib bo'lmadi: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Taklifni qabul qilishda xato: {e}")
+            return None
+    
+    @tracer.traced()
+    def set_invitation_message(self, invitation_id, message_id):
+        """Taklif xabarining ID sini saqlaydi"""
+        try:
+            self.cursor.execute(
+                'UPDATE invitations SET message_id = ? WHERE invitation_id = ?',
+                (message_id, invitation_id)
+            )
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Taklif xabarini saqlashda xato: {e}")
+    
+    def get_pending_invitations(self):
+        """Barcha pending takliflar (yaratilgan vaqti unix sekundda)"""
+        try:
+            self.cursor.execute('''
+                SELECT invitation_id, sender_id, receiver_id, message_id,
+                       CAST(strftime('%s', created_at) AS INTEGER) AS created_ts
+                FROM invitations
+                WHERE status = 'pending'
+            ''')
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Pending takliflarni olishda xato: {e}")
+            return []
+    
+    def expire_invitations(self, invitation_ids, batch_size=500):
+        """Takliflarni 'expired' qiladi, haqiqatan o'zgarganlarini qaytaradi"""
+        expired = []
+        try:
+            with self.transaction() as cursor:
+                for i in range(0, len(invitation_ids), batch_size):
+                    batch = list(invitation_ids[i:i + batch_size])
+                    placeholders = ','.join('?' * len(batch))
+                    cursor.execute(f'''
+                        SELECT invitation_id FROM invitations
+                        WHERE status = 'pending' AND invitation_id IN ({placeholders})
+                    ''', batch)
+                    ids = [row[0] for row in cursor.fetchall()]
+                    if not ids:
+                        continue
+                    placeholders = ','.join('?' * len(ids))
+                    cursor.execute(f'''
+                        UPDATE invitations
+                        SET status = 'expired', responded_at = ?
+                        WHERE invitation_id IN ({placeholders})
+                    ''', [datetime.now()] + ids)
+                    expired.extend(ids)
+            return expired
+        except Exception as e:
+            logger.error(f"Takliflar muddatini tugatishda xato: {e}")
+            return []
+    
     # ========== MESSAGE OPERATIONS ==========
     
-    def add_message(self, chat_id, sender_id, message_type, content):
+    @tracer.traced()
+    def add_message(self, chat_id, sender_id, message_type, content, file_id=None):
         """Xabar qo'shadi"""
         try:
             self.cursor.execute('''
-                INSERT INTO messages (chat_id, sender_id, message_type, content)
-                VALUES (?, ?, ?, ?)
-            ''', (chat_id, sender_id, message_type, content))
+                INSERT INTO messages (chat_id, sender_id, message_type, content, file_id)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (chat_id, sender_id, message_type, content, file_id))
             self.conn.commit()
             return self.cursor.lastrowid
         except Exception as e:
             logger.error(f"Xabar qo'shishda xato: {e}")
             return None
     
+    @tracer.traced()
+    def add_relayed_message(self, chat_id, sender_id, partner_id, message_type, content,
+                            file_id, message_id, partner_message_id):
+        """Xabarni saqlaydi va ikki tomondagi message_id larni bog'laydi.
+        
+        Har ikki yo'nalish yoziladi: sherik javob bersa yoki yuboruvchi
+        tahrirlasa ham mos nusxa topiladi.
+        """
+        try:
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO messages (chat_id, sender_id, message_type, content, file_id)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (chat_id, sender_id, message_type, content, file_id))
+                db_message_id = cursor.lastrowid
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO relay_map
+                    (user_id, message_id, partner_message_id, chat_id, db_message_id)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (
+                    (sender_id, message_id, partner_message_id, chat_id, db_message_id),
+                    (partner_id, partner_message_id, message_id, chat_id, db_message_id),
+                ))
+            return db_message_id
+        except Exception as e:
+            logger.error(f"Xabar qo'shishda xato: {e}")
+            return None
+    
+    @tracer.traced()
+    def get_relayed(self, chat_id, user_id, message_id):
+        """(partner_message_id, db_message_id) yoki None (faqat shu chat ichida)"""
+        try:
+            self.cursor.execute('''
+                SELECT partner_message_id, db_message_id FROM relay_map
+                WHERE user_id = ? AND message_id = ? AND chat_id = ?
+            ''', (user_id, message_id, chat_id))
+            row = self.cursor.fetchone()
+            return tuple(row) if row else None
+        except Exception as e:
+            logger.error(f"Xabar bog'lanishini olishda xato: {e}")
+            return None
+    
+    @tracer.traced()
+    def update_message_content(self, message_id, content):
+        """Tahrirlangan xabar matnini yangilaydi (FTS trigger orqali yangilanadi)"""
+        try:
+            self.cursor.execute(
+                'UPDATE messages SET content = ? WHERE message_id = ?', (content, message_id)
+            )
+            self.conn.commit()
+            return self.cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Xabarni yangilashda xato: {e}")
+            return False
+    
+    @tracer.traced()
+    def get_chat_messages(self, chat_id, before_id=None, after_id=None, limit=10):
+        """Chat xabarlarining bitta sahifasi (keyset pagination).
+        
+        (xabarlar eskidan yangiga, eskirog'i bormi, yangirog'i bormi) qaytaradi.
+        """
+        try:
+            if after_id is not None:
+                rows = self._select(Message, '''
+                    WHERE chat_id = ? AND message_id > ?
+                    ORDER BY message_id ASC
+                    LIMIT ?
+                ''', (chat_id, after_id, limit + 1)).fetchall()
+                has_newer = len(rows) > limit
+                return rows[:limit], True, has_newer
+            
+            if before_id is None:
+                # Eng yangi sahifa
+                cursor = self._select(Message, '''
+                    WHERE chat_id = ?
+                    ORDER BY message_id DESC
+                    LIMIT ?
+                ''', (chat_id, limit + 1))
+            else:
+                cursor = self._select(Message, '''
+                    WHERE chat_id = ? AND message_id < ?
+                    ORDER BY message_id DESC
+                    LIMIT ?
+                ''', (chat_id, before_id, limit + 1))
+            rows = cursor.fetchall()
+            has_older = len(rows) > limit
+            has_newer = before_id is not None
+            return list(reversed(rows[:limit])), has_older, has_newer
+        except Exception as e:
+            logger.error(f"Chat xabarlarini olishda xato: {e}")
+            return [], False, False
+    
+    @tracer.traced()
+    def search_messages(self, query, limit=20):
+        """Xabarlarni FTS5 orqali qidiradi (bm25 bo'yicha saralangan)"""
+        if not self.fts_enabled:
+            return []
+        
+        # Foydalanuvchi matnini FTS sintaksisidan himoyalaymiz: har bir so'z - ibora
+        terms = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+        if not terms:
+            return []
+        
+        try:
+            self.cursor.execute('''
+                SELECT m.message_id, m.chat_id, m.sender_id, m.message_type, m.sent_at,
+                       snippet(messages_fts, 0, '«', '»', '…', 12) AS snippet
+                FROM messages_fts
+                JOIN messages m ON m.message_id = messages_fts.rowid
+                WHERE messages_fts MATCH ?
+                ORDER BY bm25(messages_fts)
+                LIMIT ?
+            ''', (terms, limit))
+            return self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Xabarlarni qidirishda xato: {e}")
+            return []
+    
+    # ========== ANALYTICS ==========
+    
+    # metric, jadval, watermark ustuni, UTC vaqt ifodasi, qo'shimcha shart, kechikish chegarasi
+    # ID bo'yicha watermark monoton; vaqt bo'yicha watermarklarda (faqat UTC
+    # ustunlar) yozilayotgan soniyani o'tkazib yubormaslik uchun bir necha
+    # soniya kechikib yig'amiz. datetime.now() bilan yozilgan ustunlar mahalliy
+    # vaqtda - 'utc' bilan o'giramiz, watermark esa rollup_events.event_id.
+    ROLLUPS = (
+        ('messages', 'messages', 'message_id', 'sent_at', None, None),
+        ('chats_started', 'chats', 'chat_id', "datetime(created_at, 'utc')", None, None),
+        ('invitations_sent', 'invitations', 'invitation_id', 'created_at', None, None),
+        ('new_users', 'users', 'created_at', 'created_at', None,
+         "datetime('now', '-5 seconds')"),
+        ('chats_ended', 'rollup_events', 'event_id', "datetime(happened_at, 'utc')",
+         "metric = 'chats_ended'", None),
+        ('invitations_accepted', 'rollup_events', 'event_id', "datetime(happened_at, 'utc')",
+         "metric = 'invitations_accepted'", None),
+    )
+    
+    def refresh_rollups(self):
+        """Yangi qatorlarni watermarkdan boshlab agregat jadvallarga qo'shadi"""
+        try:
+            with self.transaction() as cursor:
+                for metric, table, mark, time_expr, condition, cutoff in self.ROLLUPS:
+                    cursor.execute(
+                        'SELECT watermark FROM rollup_state WHERE metric = ?', (metric,)
+                    )
+                    row = cursor.fetchone()
+                    watermark = row[0] if row else (0 if cutoff is None else '')
+                    
+                    where = [f'{mark} IS NOT NULL', f'{mark} > ?']
+                    params = [watermark]
+                    if cutoff:
+                        where.append(f'{mark} <= {cutoff}')
+                    if condition:
+                        where.append(condition)
+                    
+                    cursor.execute(f'''
+                        SELECT strftime('%Y-%m-%d %H:00', {time_expr}) AS bucket,
+                               COUNT(*) AS value,
+                               MAX({mark}) AS mark
+                        FROM {table}
+                        WHERE {' AND '.join(where)}
+                        GROUP BY bucket
+                    ''', params)
+                    rows = cursor.fetchall()
+                    if not rows:
+                        continue
+                    
+                    for bucket, value, _ in rows:
+                        for table_name, key in (('stats_hourly', bucket), ('stats_daily', bucket[:10])):
+                            cursor.execute(f'''
+                                INSERT INTO {table_name} (bucket, metric, value)
+                                VALUES (?, ?, ?)
+                                ON CONFLICT(bucket, metric) DO UPDATE SET
+                                    value = value + excluded.value
+                            ''', (key, metric, value))
+                    
+                    cursor.execute('''
+                        INSERT INTO rollup_state (metric, watermark) VALUES (?, ?)
+                        ON CONFLICT(metric) DO UPDATE SET watermark = excluded.watermark
+                    ''', (metric, max(r[2] for r in rows)))
+            return True
+        except Exception as e:
+            logger.error(f"Agregatlarni yangilashda xato: {e}")
+            return False
+    
+    def get_rollups(self, hourly=False, periods=14):
+        """Oxirgi N kun (yoki soat) agregatlari: {bucket: {metric: value}}"""
+        try:
+            if hourly:
+                self.cursor.execute('''
+                    SELECT bucket, metric, value FROM stats_hourly
+                    WHERE bucket >= strftime('%Y-%m-%d %H:00', 'now', ?)
+                    ORDER BY bucket
+                ''', (f'-{periods - 1} hours',))
+            else:
+                self.cursor.execute('''
+                    SELECT bucket, metric, value FROM stats_daily
+                    WHERE bucket >= date('now', ?)
+                    ORDER BY bucket
+                ''', (f'-{periods - 1} days',))
+            
+            result = {}
+            for bucket, metric, value in self.cursor.fetchall():
+                result.setdefault(bucket, {})[metric] = value
+            return result
+        except Exception as e:
+            logger.error(f"Agregatlarni olishda xato: {e}")
+            return {}
+    
     # ========== STATISTICS ==========
     
     def get_stats(self):
@@ -294,6 +1021,10 @@ class Database:
             self.cursor.execute('SELECT COUNT(*) FROM messages')
             stats['total_messages'] = self.cursor.fetchone()[0]
             
+            # Botni bloklaganlar
+            self.cursor.execute('SELECT COUNT(*) FROM users WHERE unreachable_at IS NOT NULL')
+            stats['unreachable_users'] = self.cursor.fetchone()[0]
+            
             return stats
             
         except Exception as e:
@@ -302,6 +1033,10 @@ class Database:
     
     def cleanup_old_data(self, days=30):
         """Eski ma'lumotlarni tozalaydi"""
+        # O'chirishdan oldin agregatlarga qo'shib olamiz
+        if not self.refresh_rollups():
+            return False
+        
         try:
             # Eski chatlarni o'chirish
             self.cursor.execute('''
@@ -322,6 +1057,33 @@ class Database:
                 WHERE sent_at < datetime('now', ?)
             ''', (f'-{days} days',))
             
+            # Tugagan chatlarning xabar bog'lanishlari endi kerak emas
+            self.cursor.execute('''
+                DELETE FROM relay_map WHERE chat_id NOT IN (
+                    SELECT chat_id FROM chats WHERE is_active = 1
+                )
+            ''')
+            
+            # Faol chatlarda esa har biri uchun eng yangi bog'lanishlar qoladi
+            self.cursor.execute('''
+                DELETE FROM relay_map WHERE (user_id, message_id) IN (
+                    SELECT user_id, message_id FROM (
+                        SELECT user_id, message_id, ROW_NUMBER() OVER (
+                            PARTITION BY chat_id ORDER BY db_message_id DESC
+                        ) AS position
+                        FROM relay_map
+                    ) WHERE position > ?
+                )
+            ''', (Config.RELAY_MAP_PER_CHAT * 2,))
+            
+            # Agregatlarga qo'shilgan hodisalar endi kerak emas
+            self.cursor.execute('''
+                DELETE FROM rollup_events WHERE event_id <= COALESCE((
+                    SELECT watermark FROM rollup_state
+                    WHERE rollup_state.metric = rollup_events.metric
+                ), 0)
+            ''')
+            
             # Faolligi eskirgan foydalanuvchilarni o'chirish
             self.cursor.execute('''
                 DELETE FROM users 
@@ -329,6 +1091,7 @@ class Database:
             ''', (f'-{days*2} days',))
             
             self.conn.commit()
+            self._profiles.clear()
             return True
         except Exception as e:
             logger.error(f"Ma'lumotlarni tozalashda xato: {e}")
@@ -338,6 +1101,9 @@ class Database:
         """Database ni yopadi"""
         if self.conn:
             self.conn.close()
+            self.conn = None
+            self.cursor = None
+            self._profiles.clear()
 
-# Global database obyekti
+# Global database obyekti (db.open() chaqirilgach ishlaydi)
 db = Database()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Ma'lumotlarni oqimli eksport/import qilish (users, chats, invitations, messages)
+
+Qatorlar fetchmany bilan partiyalab o'qiladi va yoziladi, shuning uchun xotira
+hajmi jadval kattaligiga bog'liq emas:
+    python datatool.py export dump/ --format jsonl
+    python datatool.py import dump/ --database yangi.db
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+TABLES = ('users', 'chats', 'invitations', 'messages')
+FORMATS = ('jsonl', 'csv')
+
+def parse_args():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--database', default=Config.DATABASE, help="baza fayli")
+    common.add_argument('--batch-size', type=int, default=5000,
+                        help="bitta partiyadagi qatorlar soni")
+    common.add_argument('--tables', nargs='+', choices=TABLES, default=list(TABLES))
+
+    parser = argparse.ArgumentParser(description="Ma'lumotlarni eksport/import qilish")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export = sub.add_parser('export', parents=[common], help="bazadan fayllarga")
+    export.add_argument('directory')
+    export.add_argument('--format', choices=FORMATS, default='jsonl')
+    export.add_argument('--no-compress', action='store_true', help="gzip ishlatmaslik")
+
+    imp = sub.add_parser('import', parents=[common], help="fayllardan bazaga")
+    imp.add_argument('directory')
+    return parser.parse_args()
+
+def open_file(path, mode):
+    """.gz bo'lsa gzip orqali, aks holda oddiy matn fayli"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+def find_input(directory, table):
+    """Jadval uchun import faylini topadi"""
+    for fmt in FORMATS:
+        for suffix in ('.gz', ''):
+            path = os.path.join(directory, f'{table}.{fmt}{suffix}')
+            if os.path.exists(path):
+                return path, fmt
+    return None, None
+
+class Progress:
+    """Qatorlar soni va tezligi haqida hisobot"""
+
+    def __init__(self, action, table, every=100000):
+        self.action = action
+        self.table = table
+        self.every = every
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def add(self, count):
+        before = self.rows
+        self.rows += count
+        if self.rows // self.every > before // self.every:
+            self.report()
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed else 0
+        mark = '✅' if final else '…'
+        print(f"{mark} {self.action} {self.table}: {self.rows} qator, "
+              f"{elapsed:.1f}s ({rate:.0f} qator/s)")
+
+def export_table(conn, table, directory, fmt, compress, batch_size):
+    """Jadvalni faylga oqim bilan yozadi"""
+    path = os.path.join(directory, f'{table}.{fmt}' + ('.gz' if compress else ''))
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT * FROM {table} ORDER BY rowid')
+    columns = [d[0] for d in cursor.description]
+    progress = Progress('eksport', table)
+
+    with open_file(path, 'w') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if writer:
+                writer.writerows(tuple(row) for row in rows)
+            else:
+                f.writelines(
+                    json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+                    for row in rows
+                )
+            progress.add(len(rows))
+
+    progress.report(final=True)
+
+def read_rows(f, fmt):
+    """Fayldan (ustunlar, qator) juftliklarini oqim bilan o'qiydi"""
+    if fmt == 'csv':
+        reader = csv.reader(f)
+        columns = next(reader, None)
+        for row in reader:
+            yield columns, [value if value != '' else None for value in row]
+    else:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                yield list(data), list(data.values())
+
+class InvariantError(Exception):
+    """Import qilingan ma'lumot indeks yoki trigger shartini buzadi"""
+
+    def __init__(self, failed):
+        self.failed = failed
+        super().__init__(', '.join(name for name, _ in failed))
+
+@contextmanager
+def deferred_indexes(conn, tables):
+    """Importni bitta tranzaksiyada indeks va triggerlarsiz bajaradi.
+    
+    Oxirida ular qayta yaratiladi; birortasi yaratilmasa (masalan, bitta
+    foydalanuvchining ikkita faol chati bo'lsa) import butunlay bekor
+    qilinadi va InvariantError ko'tariladi - baza shartlarsiz qolmaydi.
+    """
+    placeholders = ','.join('?' * len(tables))
+    saved = conn.execute(f'''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+        AND tbl_name IN ({placeholders})
+    ''', tables).fetchall()
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for kind, name, _ in saved:
+            conn.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+        yield
+
+        started = time.perf_counter()
+        failed = []
+        for _, name, sql in saved:
+            try:
+                conn.execute(sql)
+            except sqlite3.Error as e:
+                failed.append((name, e))
+        if failed:
+            raise InvariantError(failed)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    print(f"✅ Indekslar qayta qurildi ({time.perf_counter() - started:.1f}s)")
+
+def import_table(conn, table, path, fmt, batch_size):
+    """Fayldagi qatorlarni partiyalab yozadi (tranzaksiya deferred_indexes da)"""
+    progress = Progress('import', table)
+    sql = None
+    batch = []
+
+    def flush():
+        conn.executemany(sql, batch)
+        progress.add(len(batch))
+        batch.clear()
+
+    with open_file(path, 'r') as f:
+        for columns, values in read_rows(f, fmt):
+            if sql is None:
+                sql = (
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})"
+                )
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    progress.report(final=True)
+
+def main():
+    """Asosiy funksiya"""
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    # Baza db.open() da ochiladi
+    Config.DATABASE = args.database
+    from database import db
+    if not db.open():
+        sys.exit(1)
+
+    conn = db.conn
+    if conn.in_transaction:
+        conn.commit()
+
+    if args.command == 'export':
+        os.makedirs(args.directory, exist_ok=True)
+        for table in args.tables:
+            export_table(conn, table, args.directory, args.format,
+                         not args.no_compress, args.batch_size)
+    else:
+        inputs = [(table, *find_input(args.directory, table)) for table in args.tables]
+        inputs = [(table, path, fmt) for table, path, fmt in inputs if path]
+        if not inputs:
+            print("❌ Import uchun fayl topilmadi")
+            sys.exit(1)
+
+        try:
+            with deferred_indexes(conn, [table for table, _, _ in inputs]):
+                for table, path, fmt in inputs:
+                    import_table(conn, table, path, fmt, args.batch_size)
+        except InvariantError as e:
+            print("❌ Import bekor qilindi, baza o'zgarmadi. Buzilgan shartlar:")
+            for name, error in e.failed:
+                print(f"   {name}: {error}")
+            db.close()
+            sys.exit(1)
+
+        if any(table == 'messages' for table, _, _ in inputs) and db.fts_enabled:
+            db.rebuild_search_index()
+
+    db.close()
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
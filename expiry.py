@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import logging
+import time
+from config import Config
+from database import db
+
+logger = logging.getLogger(__name__)
+
+class InvitationExpiry:
+    """Pending takliflarni REQUEST_TIMEOUT dan keyin muddati o'tgan deb belgilaydi.
+
+    Muddatlar xotiradagi heap da saqlanadi: jadvalni davriy skanerlash yo'q,
+    faqat ishga tushganda pending takliflardan heap qayta quriladi.
+    """
+
+    def __init__(self, timeout=Config.REQUEST_TIMEOUT):
+        self.timeout = timeout
+        self.bot = None
+        self._heap = []  # (deadline, invitation_id, receiver_id, message_id)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def start(self, bot):
+        """Heap ni bazadan tiklaydi va fon vazifasini ishga tushiradi"""
+        self.bot = bot
+        self._heap = [
+            (row['created_ts'] + self.timeout, row['invitation_id'],
+             row['receiver_id'], row['message_id'])
+            for row in db.get_pending_invitations()
+        ]
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Taklif muddatlari tiklandi: {len(self._heap)} ta")
+
+    async def stop(self):
+        """Fon vazifasini to'xtatadi"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, invitation_id, receiver_id, message_id=None):
+        """Yangi taklif muddatini rejalashtiradi"""
+        deadline = time.time() + self.timeout
+        heapq.heappush(self._heap, (deadline, invitation_id, receiver_id, message_id))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                if not self._heap:
+                    await self._wakeup.wait()
+                    self._wakeup.clear()
+                    continue
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+
+                # Muddati kelgan barcha takliflarni bitta partiyada olamiz
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+
+                await self._expire(due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Taklif muddatini tekshirishda xato: {e}")
+                await asyncio.sleep(1)
+
+    async def _expire(self, due):
+        expired = set(db.expire_invitations([item[1] for item in due]))
+        if not expired:
+            return
+
+        # Eskirgan taklif xabaridagi tugmalarni olib tashlaymiz
+        for _, invitation_id, receiver_id, message_id in due:
+            if invitation_id not in expired or not message_id:
+                continue
+            try:
+                await self.bot.edit_message_text(
+                    chat_id=receiver_id,
+                    message_id=message_id,
+                    text=Config.MESSAGES['invite_expired']
+                )
+            except Exception as e:
+                logger.warning(f"Taklif xabarini tahrirlab bo'lmadi ({invitation_id}): {e}")
+
+        logger.info(f"Muddati tugagan takliflar: {len(expired)} ta")
+
+# Global obyekt
+invitation_expiry = InvitationExpiry()
@@ -0,0 +1,118 @@
+from string import Formatter
+from telegram import MessageEntity
+
+# Shablonlardagi belgilar (Telegram legacy Markdown bilan bir xil, ichma-ich emas)
+MARKERS = (
+    ('```', MessageEntity.PRE),
+    ('*', MessageEntity.BOLD),
+    ('_', MessageEntity.ITALIC),
+    ('`', MessageEntity.CODE),
+)
+
+def utf16_len(text):
+    """Telegram entity offsetlari UTF-16 kod birliklarida hisoblanadi"""
+    return len(text.encode('utf-16-le')) // 2
+
+class Formatted:
+    """Matn va uning MessageEntity lari.
+
+    parse_mode ishlatilmaydi: foydalanuvchi matni hech qachon parse qilinmaydi,
+    shuning uchun `_`, `*`, `` ` ``, `[` kabi belgilar yuborishni buzmaydi.
+    """
+
+    __slots__ = ('text', 'entities')
+
+    def __init__(self, text='', entities=()):
+        self.text = text
+        self.entities = list(entities)
+
+    def __add__(self, other):
+        if isinstance(other, str):
+            other = Formatted(other)
+        shift = utf16_len(self.text)
+        return Formatted(
+            self.text + other.text,
+            self.entities + [
+                MessageEntity(
+                    type=e.type, offset=e.offset + shift, length=e.length,
+                    url=e.url, user=e.user, language=e.language,
+                    custom_emoji_id=e.custom_emoji_id
+                )
+                for e in other.entities
+            ]
+        )
+
+    def __radd__(self, other):
+        return Formatted(other) + self
+
+    def __bool__(self):
+        return bool(self.text)
+
+    def as_message(self):
+        """send_message / reply_text / edit_message_text uchun kwargs"""
+        return {'text': self.text, 'entities': self.entities or None}
+
+    def as_caption(self):
+        """send_photo va boshqa media uchun kwargs"""
+        return {'caption': self.text, 'caption_entities': self.entities or None}
+
+def styled(text, entity_type):
+    """Butun matnga bitta uslub beradi"""
+    text = str(text)
+    if not text:
+        return Formatted()
+    return Formatted(text, [MessageEntity(type=entity_type, offset=0, length=utf16_len(text))])
+
+def bold(text):
+    return styled(text, MessageEntity.BOLD)
+
+def code(text):
+    return styled(text, MessageEntity.CODE)
+
+def user_text(message):
+    """Foydalanuvchi xabari matni o'z formatlash entitylari bilan"""
+    if message.text is not None:
+        return Formatted(message.text, message.entities)
+    return Formatted(message.caption or '', message.caption_entities)
+
+def _split_markup(template):
+    """Shablonni (matn, uslub) bo'laklariga ajratadi"""
+    runs = []
+    buffer = []
+    active = None
+    i = 0
+    while i < len(template):
+        # {placeholder} nomlari (masalan {bot_username}) belgilar sifatida o'qilmaydi
+        if template[i] == '{' and not template.startswith('{{', i):
+            end = template.find('}', i)
+            if end != -1:
+                buffer.append(template[i:end + 1])
+                i = end + 1
+                continue
+        for marker, entity_type in MARKERS:
+            if template.startswith(marker, i) and (active is None or active[0] == marker):
+                runs.append((''.join(buffer), active[1] if active else None))
+                buffer = []
+                active = None if active else (marker, entity_type)
+                i += len(marker)
+                break
+        else:
+            buffer.append(template[i])
+            i += 1
+    runs.append((''.join(buffer), active[1] if active else None))
+    return runs
+
+def render(template, **values):
+    """Markdown-shablonni entitylarga aylantiradi, qiymatlar esa oddiy matn.
+
+    Faqat shablon (ishonchli, Config.MESSAGES dagi) belgilari uslub beradi;
+    `{name}` o'rniga qo'yilgan qiymatlar hech qachon parse qilinmaydi.
+    """
+    result = Formatted()
+    for run, entity_type in _split_markup(template):
+        text = ''.join(
+            literal + ('' if field is None else format(values[field], spec))
+            for literal, field, spec, _ in Formatter().parse(run)
+        )
+        result += styled(text, entity_type) if entity_type else Formatted(text)
+    return result
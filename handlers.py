@@ -1,13 +1,29 @@
+import asyncio
+import io
 import logging
+from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import ContextTypes
 from config import Config
 from database import db
+from expiry import invitation_expiry
+from ratelimit import rate_limiter
+from admission import update_queue
+from backup import backup_manager
+from transport import bot_transport
+from breaker import delivery_breaker, is_unreachable_error
+from lagmonitor import loop_watchdog
+from profiler import sampling_profiler
+from relaymap import relay_map
+from tracing import tracer
+from formatting import bold, render, user_text
 
 logger = logging.getLogger(__name__)
 
 # ========== COMMAND HANDLERS ==========
 
+@tracer.traced()
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/start komandasi"""
     try:
@@ -22,6 +38,11 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             last_name=user.last_name
         )
         
+        # Profil o'zgarmagan bo'lsa add_user yozmaydi - faollikni alohida yangilaymiz.
+        # /start bosgan foydalanuvchi botni blokdan ham chiqargan
+        db.update_user_activity(user_id)
+        delivery_breaker.reset(user_id)
+        
         # Klaviatura
         keyboard = [
             [InlineKeyboardButton("💑 Sevgan odamimni qo'shish", callback_data='add_partner')],
@@ -32,15 +53,14 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Xabar
         message = (
-            f"{Config.MESSAGES['welcome'].format(name=user.first_name)}\n\n"
-            f"{Config.MESSAGES['your_id'].format(user_id=user_id)}\n\n"
-            f"{Config.MESSAGES['how_get_id']}"
+            render(Config.MESSAGES['welcome'], name=user.first_name) + "\n\n" +
+            render(Config.MESSAGES['your_id'], user_id=user_id) + "\n\n" +
+            render(Config.MESSAGES['how_get_id'])
         )
         
         await update.message.reply_text(
-            message,
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
+            **message.as_message(),
+            reply_markup=reply_markup
         )
         
         logger.info(f"Foydalanuvchi {user_id} start bosdi")
@@ -51,11 +71,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/help komandasi"""
-    await update.message.reply_text(
-        Config.MESSAGES['help_text'],
-        parse_mode='Markdown'
-    )
+    await update.message.reply_text(**render(Config.MESSAGES['help_text']).as_message())
 
+@tracer.traced()
 async def end_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/end komandasi - chatni tugatish"""
     try:
@@ -69,25 +87,23 @@ async def end_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         # Chatni tugatamiz
-        if db.end_chat(chat['chat_id']):
+        if db.end_chat(chat.chat_id):
+            relay_map.forget(chat.chat_id)
             # Sherigga xabar
-            partner_id = chat['user2_id'] if chat['user1_id'] == user_id else chat['user1_id']
+            partner_id = chat.partner_of(user_id)
             
             try:
-                await context.bot.send_message(
-                    chat_id=partner_id,
-                    text="🔚 *Chat tugatildi*\n\nSherigingiz chatni tugatdi.",
-                    parse_mode='Markdown'
-                )
+                if not delivery_breaker.is_open(partner_id):
+                    await context.bot.send_message(
+                        chat_id=partner_id,
+                        **render(Config.MESSAGES['partner_ended']).as_message()
+                    )
             except:
                 pass
             
-            await update.message.reply_text(
-                Config.MESSAGES['chat_ended'],
-                parse_mode='Markdown'
-            )
+            await update.message.reply_text(**render(Config.MESSAGES['chat_ended']).as_message())
             
-            logger.info(f"Chat tugatildi: {chat['chat_id']}")
+            logger.info(f"Chat tugatildi: {chat.chat_id}")
         else:
             await update.message.reply_text("❌ Chatni tugatishda xatolik")
             
@@ -95,8 +111,101 @@ async def end_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"End command xatosi: {e}")
         await update.message.reply_text("❌ Xatolik yuz berdi.")
 
+# ========== HISTORY ==========
+
+HISTORY_ICONS = {
+    'text': '💬',
+    'photo': '📸',
+    'video': '🎥',
+    'document': '📄',
+    'audio': '🎵',
+    'voice': '🎤',
+    'sticker': '🩷',
+}
+
+def render_history_page(chat_id, before_id=None, after_id=None):
+    """Chat tarixining bitta sahifasi: (matn, klaviatura)"""
+    page_size = Config.HISTORY_PAGE_SIZE
+    messages, has_older, has_newer = db.get_chat_messages(
+        chat_id, before_id=before_id, after_id=after_id, limit=page_size
+    )
+    
+    if not messages:
+        return "📭 Bu chatda hali xabarlar yo'q", None
+    
+    names = db.get_display_names([m.sender_id for m in messages])
+    
+    # Eskidan yangiga qarab ko'rsatamiz
+    lines = [f"📜 Chat tarixi (#{chat_id})"]
+    for m in messages:
+        icon = HISTORY_ICONS.get(m.message_type, '💬')
+        content = m.content or ''
+        if len(content) > Config.HISTORY_PREVIEW_LENGTH:
+            content = content[:Config.HISTORY_PREVIEW_LENGTH] + '…'
+        if m.message_type != 'text':
+            content = f"[{m.message_type}] {content}".rstrip()
+        lines.append(
+            f"{icon} {names.get(m.sender_id, m.sender_id)} "
+            f"({str(m.sent_at)[:16]}):\n{content}"
+        )
+    
+    buttons = []
+    if has_older:
+        buttons.append(InlineKeyboardButton(
+            "⬅️ Eskiroq", callback_data=f"hist_{chat_id}_o_{messages[0].message_id}"
+        ))
+    if has_newer:
+        buttons.append(InlineKeyboardButton(
+            "Yangiroq ➡️", callback_data=f"hist_{chat_id}_n_{messages[-1].message_id}"
+        ))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    
+    return '\n\n'.join(lines)[:Config.MAX_MESSAGE_LENGTH], reply_markup
+
+@tracer.traced()
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/history komandasi - joriy yoki oxirgi chat tarixi"""
+    try:
+        user_id = update.effective_user.id
+        
+        chat = db.get_last_chat(user_id)
+        if not chat:
+            await update.message.reply_text(Config.MESSAGES['no_active_chat'])
+            return
+        
+        text, reply_markup = render_history_page(chat.chat_id)
+        await update.message.reply_text(text, reply_markup=reply_markup)
+        
+    except Exception as e:
+        logger.error(f"History command xatosi: {e}")
+        await update.message.reply_text("❌ Xatolik yuz berdi.")
+
+async def history_callback(query, context):
+    """Tarix sahifalari orasida yurish (callback)"""
+    try:
+        user_id = query.from_user.id
+        _, chat_id, direction, message_id = query.data.split('_')
+        chat_id, message_id = int(chat_id), int(message_id)
+        
+        # Faqat chat ishtirokchilari ko'ra oladi
+        chat = db.get_chat(chat_id)
+        if not chat or not chat.has_member(user_id):
+            await query.edit_message_text("❌ Chat topilmadi!")
+            return
+        
+        if direction == 'o':
+            text, reply_markup = render_history_page(chat_id, before_id=message_id)
+        else:
+            text, reply_markup = render_history_page(chat_id, after_id=message_id)
+        
+        await query.edit_message_text(text, reply_markup=reply_markup)
+        
+    except Exception as e:
+        logger.error(f"History callback xatosi: {e}")
+
 # ========== CALLBACK QUERY HANDLERS ==========
 
+@tracer.traced()
 async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Barcha callback querylar"""
     query = update.callback_query
@@ -115,6 +224,8 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
         await accept_invitation(query, context)
     elif data.startswith('reject_'):
         await reject_invitation(query, context)
+    elif data.startswith('hist_'):
+        await history_callback(query, context)
 
 async def add_partner_callback(query, context):
     """Partner qo'shish"""
@@ -125,10 +236,7 @@ async def add_partner_callback(query, context):
         await query.edit_message_text("⚠️ Siz allaqachon faol chatdasiz!")
         return
     
-    await query.edit_message_text(
-        Config.MESSAGES['partner_add'],
-        parse_mode='Markdown'
-    )
+    await query.edit_message_text(**render(Config.MESSAGES['partner_add']).as_message())
     
     # Holatni saqlaymiz
     context.user_data['waiting_for_partner_id'] = True
@@ -142,32 +250,27 @@ async def end_chat_callback(query, context):
         await query.edit_message_text(Config.MESSAGES['no_active_chat'])
         return
     
-    if db.end_chat(chat['chat_id']):
+    if db.end_chat(chat.chat_id):
+        relay_map.forget(chat.chat_id)
         # Sherigga xabar
-        partner_id = chat['user2_id'] if chat['user1_id'] == user_id else chat['user1_id']
+        partner_id = chat.partner_of(user_id)
         
         try:
-            await context.bot.send_message(
-                partner_id,
-                "🔚 *Chat tugatildi*\n\nSherigingiz chatni tugatdi.",
-                parse_mode='Markdown'
-            )
+            if not delivery_breaker.is_open(partner_id):
+                await context.bot.send_message(
+                    partner_id,
+                    **render(Config.MESSAGES['partner_ended']).as_message()
+                )
         except:
             pass
         
-        await query.edit_message_text(
-            Config.MESSAGES['chat_ended'],
-            parse_mode='Markdown'
-        )
+        await query.edit_message_text(**render(Config.MESSAGES['chat_ended']).as_message())
     else:
         await query.edit_message_text("❌ Chatni tugatishda xatolik")
 
 async def help_callback(query, context):
     """Yordam (callback)"""
-    await query.edit_message_text(
-        Config.MESSAGES['help_text'],
-        parse_mode='Markdown'
-    )
+    await query.edit_message_text(**render(Config.MESSAGES['help_text']).as_message())
 
 # ========== INVITATION HANDLERS ==========
 
@@ -183,40 +286,33 @@ async def accept_invitation(query, context):
         
         sender_id = int(data[1])
         
-        # Taklifni tekshiramiz
-        invitation = db.get_invitation(sender_id, receiver_id)
-        if not invitation:
-            await query.edit_message_text("❌ Taklif topilmadi!")
-            return
+        # Taklifni qabul qilamiz va chat yaratamiz (bitta tranzaksiya)
+        chat_id = db.accept_invitation(sender_id, receiver_id)
         
-        # Taklif holatini yangilaymiz
-        db.update_invitation_status(sender_id, receiver_id, 'accepted')
+        if not chat_id:
+            if db.get_active_chat(receiver_id) or db.get_active_chat(sender_id):
+                await query.edit_message_text(Config.MESSAGES['user_busy'])
+            else:
+                await query.edit_message_text("❌ Taklif topilmadi yoki muddati tugagan!")
+            return
         
-        # Chat yaratamiz
-        chat_id = db.create_chat(sender_id, receiver_id)
+        # Qabul qiluvchiga xabar
+        await query.edit_message_text(**render(Config.MESSAGES['chat_started']).as_message())
         
-        if chat_id:
-            # Qabul qiluvchiga xabar
-            await query.edit_message_text(
-                Config.MESSAGES['chat_started'],
-                parse_mode='Markdown'
+        # Taklif yuboruvchiga xabar
+        sender_name = query.from_user.first_name
+        try:
+            await context.bot.send_message(
+                chat_id=sender_id,
+                **(
+                    render(Config.MESSAGES['invite_accepted'], name=sender_name) + "\n\n" +
+                    render(Config.MESSAGES['chat_started'])
+                ).as_message()
             )
-            
-            # Taklif yuboruvchiga xabar
-            sender_name = query.from_user.first_name
-            try:
-                await context.bot.send_message(
-                    chat_id=sender_id,
-                    text=f"🎉 *{sender_name} chatni qabul qildi!*\n\n"
-                         f"{Config.MESSAGES['chat_started']}",
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"Taklif yuboruvchiga xabar yuborishda xato: {e}")
-            
-            logger.info(f"Yangi chat yaratildi: {chat_id}")
-        else:
-            await query.edit_message_text("❌ Chat yaratishda xatolik!")
+        except Exception as e:
+            logger.error(f"Taklif yuboruvchiga xabar yuborishda xato: {e}")
+        
+        logger.info(f"Yangi chat yaratildi: {chat_id}")
             
     except Exception as e:
         logger.error(f"Taklifni qabul qilishda xato: {e}")
@@ -252,16 +348,25 @@ async def reject_invitation(query, context):
 
 # ========== MESSAGE HANDLERS ==========
 
+@tracer.traced()
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Barcha xabarlarni qayta ishlash"""
     try:
         user_id = update.effective_user.id
+        waiting_for_partner_id = context.user_data.get('waiting_for_partner_id')
+        
+        # Flooddan himoya (DB va API ishidan oldin). Taklif limiti esa ID
+        # to'g'ri kiritilgandan keyin, process_partner_id da olinadi
+        if not rate_limiter.allow('message', user_id):
+            await reply_throttled(update, 'message', 'slow_down')
+            return
         
-        # Faollikni yangilaymiz
+        # Faollikni yangilaymiz (yozayotgan foydalanuvchiga yetkazish mumkin)
         db.update_user_activity(user_id)
+        delivery_breaker.reset(user_id)
         
         # 1. Agar partner ID kutayotgan bo'lsa
-        if context.user_data.get('waiting_for_partner_id'):
+        if waiting_for_partner_id:
             await process_partner_id(update, context)
             return
         
@@ -272,16 +377,17 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         # 3. Boshqa holatda
-        await update.message.reply_text(
-            "🤖 *Sevishganlar Chat Boti*\n\n"
-            "💑 Chat boshlash uchun /start bosing\n"
-            "❓ Yordam uchun /help",
-            parse_mode='Markdown'
-        )
+        await update.message.reply_text(**render(Config.MESSAGES['idle']).as_message())
         
     except Exception as e:
         logger.error(f"Xabarni qayta ishlashda xato: {e}")
 
+async def reply_throttled(update, name, message_key):
+    """Limitga urilganini aytadi (har bir foydalanuvchiga interval ichida bir marta)"""
+    if rate_limiter.should_notify(name, update.effective_user.id):
+        await update.message.reply_text(Config.MESSAGES[message_key])
+
+@tracer.traced()
 async def process_partner_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Partner ID ni qayta ishlash"""
     try:
@@ -300,6 +406,11 @@ async def process_partner_id(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await update.message.reply_text(Config.MESSAGES['self_id'])
             return
         
+        # Taklif limiti faqat haqiqiy urinishlar uchun (Bot API so'rovlaridan oldin)
+        if not rate_limiter.allow('invite', user_id):
+            await reply_throttled(update, 'invite', 'invite_slow_down')
+            return
+        
         # Partnerning faol chatda emasligini tekshiramiz
         if db.get_active_chat(partner_id):
             await update.message.reply_text(Config.MESSAGES['user_busy'])
@@ -308,28 +419,34 @@ async def process_partner_id(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         # Partner mavjudligini tekshiramiz
         try:
-            partner_chat = await context.bot.get_chat(partner_id)
-            partner_name = partner_chat.first_name
+            # Yaqinda botni bloklagani aniqlangan bo'lsa tekshiruv ham kerak emas
+            if delivery_breaker.is_open(partner_id):
+                raise RuntimeError("partner unreachable")
+            
+            # Ism keshda bo'lsa get_chat so'rovi kerak emas
+            partner_name = db.get_display_name(partner_id)
+            if partner_name is None:
+                partner_chat = await context.bot.get_chat(partner_id)
+                partner_name = partner_chat.first_name
             
             # Test xabari
             test_msg = await context.bot.send_message(partner_id, "🔍 Tekshiruv...")
             await context.bot.delete_message(partner_id, test_msg.message_id)
             
         except Exception as e:
-            await update.message.reply_text(
-                f"❌ *Xatolik!*\n\n"
-                f"*Sabablar:*\n"
-                f"1. ID noto'g'ri\n"
-                f"2. Foydalanuvchi botni bloklagan\n"
-                f"3. Foydalanuvchi botga /start bosmagan\n\n"
-                f"Bot: @{(await context.bot.get_me()).username}",
-                parse_mode='Markdown'
-            )
+            if is_unreachable_error(e):
+                delivery_breaker.record_failure(partner_id)
+                db.set_user_reachable(partner_id, False)
+            await update.message.reply_text(**render(
+                Config.MESSAGES['partner_unreachable'],
+                bot_username=context.bot.username
+            ).as_message())
             context.user_data['waiting_for_partner_id'] = False
             return
         
         # Taklif yaratamiz
-        if db.create_invitation(user_id, partner_id):
+        invitation_id = db.create_invitation(user_id, partner_id)
+        if invitation_id:
             # Taklifni yuboramiz
             keyboard = [
                 [
@@ -340,20 +457,27 @@ async def process_partner_id(update: Update, context: ContextTypes.DEFAULT_TYPE)
             reply_markup = InlineKeyboardMarkup(keyboard)
             
             sender_name = update.effective_user.first_name
-            await context.bot.send_message(
-                chat_id=partner_id,
-                text=Config.MESSAGES['invite_received'].format(name=sender_name) +
-                     f"\n\n👤 *Taklif qiluvchi:* {sender_name}\n"
-                     f"🆔 *ID:* `{user_id}`\n\n"
-                     f"Chatni qabul qilasizmi?",
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
+            try:
+                invite_msg = await context.bot.send_message(
+                    chat_id=partner_id,
+                    **(
+                        render(Config.MESSAGES['invite_received'], name=sender_name) + "\n\n" +
+                        render(Config.MESSAGES['invite_details'], name=sender_name, id=user_id)
+                    ).as_message(),
+                    reply_markup=reply_markup
+                )
+            except Exception:
+                # Yuborilmagan taklif pending qolsa, bu juftlik qayta taklif qila olmaydi
+                db.update_invitation_status(user_id, partner_id, 'cancelled')
+                raise
+            
+            # Taklif muddatini rejalashtiramiz
+            db.set_invitation_message(invitation_id, invite_msg.message_id)
+            invitation_expiry.schedule(invitation_id, partner_id, invite_msg.message_id)
             
             # Tasdiqlash xabari
             await update.message.reply_text(
-                Config.MESSAGES['invite_sent'].format(name=partner_name, id=partner_id),
-                parse_mode='Markdown'
+                **render(Config.MESSAGES['invite_sent'], name=partner_name, id=partner_id).as_message()
             )
             
             logger.info(f"Taklif yuborildi: {user_id} -> {partner_id}")
@@ -367,96 +491,126 @@ async def process_partner_id(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("❌ Xatolik yuz berdi!")
         context.user_data['waiting_for_partner_id'] = False
 
+def relay_text(icon, sender_name, message, action=None):
+    """Relay sarlavhasi: ism qalin, foydalanuvchi matni o'z entitylari bilan"""
+    if action is None or message.text or message.caption:
+        return f"{icon} " + bold(f"{sender_name}:") + "\n" + user_text(message)
+    return f"{icon} " + bold(sender_name) + f" {action}"
+
+@tracer.traced()
 async def forward_message(update: Update, context: ContextTypes.DEFAULT_TYPE, chat):
     """Xabarni sherigga yo'naltirish"""
     try:
         user_id = update.effective_user.id
-        chat_id = chat['chat_id']
+        chat_id = chat.chat_id
         
         # Sherikni aniqlaymiz
-        if chat['user1_id'] == user_id:
-            partner_id = chat['user2_id']
-        else:
-            partner_id = chat['user1_id']
+        partner_id = chat.partner_of(user_id)
+        
+        # Sherik botni bloklagan: cool-down davomida yuborishga urinmaymiz
+        if delivery_breaker.is_open(partner_id):
+            await update.message.reply_text(Config.MESSAGES['partner_blocked'])
+            return
         
-        # Xabarni yuboramiz
+        # Xabarni yuboramiz (foydalanuvchi matni entitylari bilan, parse qilinmaydi)
         message_text = update.message.text or update.message.caption or ""
         sender_name = update.effective_user.first_name
         
+        # Javob (reply) sherik tomonidagi mos xabarga bog'lanadi
+        reply = {}
+        replied = update.message.reply_to_message
+        if replied:
+            link = relay_map.lookup(chat_id, user_id, replied.message_id)
+            if link:
+                reply = {'reply_to_message_id': link[0], 'allow_sending_without_reply': True}
+        
         if update.message.photo:
-            await context.bot.send_photo(
+            sent = await context.bot.send_photo(
                 chat_id=partner_id,
+                **reply,
                 photo=update.message.photo[-1].file_id,
-                caption=f"📸 *{sender_name}:*\n{message_text}" if message_text else f"📸 *{sender_name}* rasm yubordi",
-                parse_mode='Markdown'
+                **relay_text("📸", sender_name, update.message, "rasm yubordi").as_caption()
             )
             message_type = 'photo'
-            content = 'photo'
+            content = message_text
+            file_id = update.message.photo[-1].file_id
             
         elif update.message.video:
-            await context.bot.send_video(
+            sent = await context.bot.send_video(
                 chat_id=partner_id,
+                **reply,
                 video=update.message.video.file_id,
-                caption=f"🎥 *{sender_name}:*\n{message_text}" if message_text else f"🎥 *{sender_name}* video yubordi",
-                parse_mode='Markdown'
+                **relay_text("🎥", sender_name, update.message, "video yubordi").as_caption()
             )
             message_type = 'video'
-            content = 'video'
+            content = message_text
+            file_id = update.message.video.file_id
             
         elif update.message.document:
-            await context.bot.send_document(
+            sent = await context.bot.send_document(
                 chat_id=partner_id,
+                **reply,
                 document=update.message.document.file_id,
-                caption=f"📄 *{sender_name}:*\n{message_text}" if message_text else f"📄 *{sender_name}* fayl yubordi",
-                parse_mode='Markdown'
+                **relay_text("📄", sender_name, update.message, "fayl yubordi").as_caption()
             )
             message_type = 'document'
-            content = 'document'
+            content = message_text
+            file_id = update.message.document.file_id
             
         elif update.message.audio:
-            await context.bot.send_audio(
+            sent = await context.bot.send_audio(
                 chat_id=partner_id,
+                **reply,
                 audio=update.message.audio.file_id,
-                caption=f"🎵 *{sender_name}:*\n{message_text}" if message_text else f"🎵 *{sender_name}* audio yubordi",
-                parse_mode='Markdown'
+                **relay_text("🎵", sender_name, update.message, "audio yubordi").as_caption()
             )
             message_type = 'audio'
-            content = 'audio'
+            content = message_text
+            file_id = update.message.audio.file_id
             
         elif update.message.voice:
-            await context.bot.send_voice(
+            sent = await context.bot.send_voice(
                 chat_id=partner_id,
+                **reply,
                 voice=update.message.voice.file_id,
-                caption=f"🎤 *{sender_name}:*\n{message_text}" if message_text else f"🎤 *{sender_name}* ovoz yubordi",
-                parse_mode='Markdown'
+                **relay_text("🎤", sender_name, update.message, "ovoz yubordi").as_caption()
             )
             message_type = 'voice'
-            content = 'voice'
+            content = message_text
+            file_id = update.message.voice.file_id
             
         elif update.message.sticker:
-            await context.bot.send_sticker(
+            sent = await context.bot.send_sticker(
                 chat_id=partner_id,
+                **reply,
                 sticker=update.message.sticker.file_id
             )
             await context.bot.send_message(
                 chat_id=partner_id,
-                text=f"🩷 *{sender_name}* sticker yubordi",
-                parse_mode='Markdown'
+                **("🩷 " + bold(sender_name) + " sticker yubordi").as_message()
             )
             message_type = 'sticker'
-            content = 'sticker'
+            content = update.message.sticker.emoji or ''
+            file_id = update.message.sticker.file_id
             
         else:
-            await context.bot.send_message(
+            sent = await context.bot.send_message(
                 chat_id=partner_id,
-                text=f"💬 *{sender_name}:*\n{update.message.text}",
-                parse_mode='Markdown'
+                **reply,
+                **relay_text("💬", sender_name, update.message).as_message()
             )
             message_type = 'text'
-            content = update.message.text[:100]  # 100 belgigacha
+            content = update.message.text
+            file_id = None
         
-        # Xabarni database ga saqlaymiz
-        db.add_message(chat_id, user_id, message_type, content)
+        delivery_breaker.reset(partner_id)
+        
+        # Xabarni database ga saqlaymiz (to'liq matn va media file_id bilan),
+        # tahrir va javoblar uchun ikki tomondagi message_id lar bog'lanadi
+        relay_map.record(
+            chat_id, user_id, update.message.message_id, partner_id, sent.message_id,
+            message_type, content, file_id
+        )
         
         # Tasdiqlash (iste'faga qarab)
         # await update.message.reply_text(Config.MESSAGES['message_sent'])
@@ -464,36 +618,150 @@ async def forward_message(update: Update, context: ContextTypes.DEFAULT_TYPE, ch
         logger.info(f"Xabar yuborildi: {user_id} -> {partner_id}")
         
     except Exception as e:
+        if is_unreachable_error(e):
+            await handle_unreachable_partner(update, chat, partner_id)
+            return
         logger.error(f"Xabarni yo'naltirishda xato: {e}")
         await update.message.reply_text(Config.MESSAGES['message_not_sent'])
 
+async def handle_unreachable_partner(update, chat, partner_id):
+    """Sherik botni bloklagan: belgilaydi, ko'p marta takrorlansa chatni tugatadi"""
+    failures = delivery_breaker.record_failure(partner_id)
+    db.set_user_reachable(partner_id, False)
+    
+    if failures >= delivery_breaker.max_failures and db.end_chat(chat.chat_id):
+        relay_map.forget(chat.chat_id)
+        logger.info(f"Chat tugatildi (sherik yetib bo'lmaydi): {chat.chat_id}")
+        await update.message.reply_text(**render(Config.MESSAGES['partner_gone']).as_message())
+    else:
+        await update.message.reply_text(Config.MESSAGES['partner_blocked'])
+
+@tracer.traced()
+async def handle_edited_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Tahrirlangan xabarni sherik tomonidagi nusxada ham tahrirlaydi"""
+    try:
+        message = update.edited_message
+        user_id = update.effective_user.id
+        
+        if not rate_limiter.allow('message', user_id):
+            return
+        
+        chat = db.get_active_chat(user_id)
+        if not chat:
+            return
+        link = relay_map.lookup(chat.chat_id, user_id, message.message_id)
+        if not link:
+            return
+        partner_message_id, db_message_id = link
+        
+        partner_id = chat.partner_of(user_id)
+        if delivery_breaker.is_open(partner_id):
+            return
+        
+        text = relay_text("✏️", update.effective_user.first_name, message, "xabarni tahrirladi")
+        if message.text is not None:
+            await context.bot.edit_message_text(
+                chat_id=partner_id, message_id=partner_message_id, **text.as_message()
+            )
+        else:
+            await context.bot.edit_message_caption(
+                chat_id=partner_id, message_id=partner_message_id, **text.as_caption()
+            )
+        
+        db.update_message_content(db_message_id, message.text or message.caption or '')
+        logger.info(f"Xabar tahrirlandi: {user_id} -> {partner_id}")
+        
+    except BadRequest as e:
+        # Matn o'zgarmagan yoki sherik xabarni o'chirgan
+        logger.debug(f"Tahrirni yetkazib bo'lmadi: {e}")
+    except Exception as e:
+        if is_unreachable_error(e):
+            delivery_breaker.record_failure(chat.partner_of(user_id))
+            return
+        logger.error(f"Tahrirni yo'naltirishda xato: {e}")
+
 # ========== ADMIN HANDLERS ==========
 
+def format_pool_stats(pools):
+    """HTTP pool statistikasini qisqa matnga aylantiradi"""
+    if not pools:
+        return "-"
+    return "; ".join(
+        f"{p['name']} {p['in_flight']}/{p['pool_size']} HTTP/{p['http_version']}, "
+        f"{p['requests']} so'rov, {p['waited']} kutdi "
+        f"(o'rt. {p['avg_wait'] * 1000:.0f}ms, maks. {p['max_wait'] * 1000:.0f}ms), "
+        f"{p['pool_timeouts']} timeout"
+        for p in pools
+    )
+
 async def admin_stat(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Bot statistikasi (/stat)"""
     user_id = update.effective_user.id
     
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
     if user_id not in Config.ADMINS:
         await update.message.reply_text("❌ Siz admin emassiz!")
         return
     
     stats = db.get_stats()
+    queue_stats = update_queue.get_stats()
+    lag_stats = loop_watchdog.get_stats()
+    relay_stats = relay_map.get_stats()
+    trace_stats = tracer.get_stats()
     
-    message = (
+    message = render(
         "📊 *Bot Statistikasi*\n\n"
-        f"👥 *Jami foydalanuvchilar:* {stats.get('total_users', 0)}\n"
-        f"💬 *Faol chatlar:* {stats.get('active_chats', 0)}\n"
-        f"📅 *Bugungi faollar:* {stats.get('today_active', 0)}\n"
-        f"✉️ *Jami xabarlar:* {stats.get('total_messages', 0)}\n"
-        f"🗄️ *Database fayli:* `{Config.DATABASE}`"
+        "👥 *Jami foydalanuvchilar:* {total_users}\n"
+        "💬 *Faol chatlar:* {active_chats}\n"
+        "📅 *Bugungi faollar:* {today_active}\n"
+        "✉️ *Jami xabarlar:* {total_messages}\n"
+        "🚫 *Limit bo'yicha tashlangan:* {rate_dropped}\n"
+        "⛔ *Botni bloklaganlar:* {unreachable_users} (tejalgan yuborishlar: {short_circuited})\n"
+        "📥 *Update navbati:* {depth}/{capacity} (maks. {max_depth}, kutish {max_wait:.1f}s)\n"
+        "🗑️ *Tashlangan updatelar:* {queue_dropped}\n"
+        "🌐 *HTTP poollar:* {pools}\n"
+        "🔗 *Xabar bog'lanishlari:* {relay_entries} ({relay_chats} chat, kesh {relay_hits}/{relay_misses})\n"
+        "🔍 *Tracing:* {traces} ta trace ({sample_rate:.1%} namuna)\n"
+        "⏱️ *Loop lag:* p50 {lag_p50:.1f}ms, p95 {lag_p95:.1f}ms, p99 {lag_p99:.1f}ms, maks. {lag_max:.0f}ms ({stalls} bloklanish)\n"
+        "🗄️ *Database fayli:* `{database}`",
+        total_users=stats.get('total_users', 0),
+        active_chats=stats.get('active_chats', 0),
+        today_active=stats.get('today_active', 0),
+        total_messages=stats.get('total_messages', 0),
+        rate_dropped=rate_limiter.get_stats()['dropped_total'],
+        unreachable_users=stats.get('unreachable_users', 0),
+        short_circuited=delivery_breaker.get_stats()['short_circuited'],
+        depth=queue_stats['depth'],
+        capacity=queue_stats['capacity'],
+        max_depth=queue_stats['max_depth'],
+        max_wait=queue_stats['max_wait'],
+        queue_dropped=sum(queue_stats['dropped'].values()),
+        pools=format_pool_stats(bot_transport.get_stats()),
+        relay_entries=relay_stats['entries'],
+        relay_chats=relay_stats['chats'],
+        relay_hits=relay_stats['hits'],
+        relay_misses=relay_stats['misses'],
+        traces=trace_stats['exported'],
+        sample_rate=trace_stats['sample_rate'],
+        lag_p50=lag_stats['p50'],
+        lag_p95=lag_stats['p95'],
+        lag_p99=lag_stats['p99'],
+        lag_max=lag_stats['max'],
+        stalls=lag_stats['stalls'],
+        database=Config.DATABASE
     )
     
-    await update.message.reply_text(message, parse_mode='Markdown')
+    await update.message.reply_text(**message.as_message())
 
 async def admin_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Barcha foydalanuvchilar (/users)"""
     user_id = update.effective_user.id
     
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
     if user_id not in Config.ADMINS:
         await update.message.reply_text("❌ Siz admin emassiz!")
         return
@@ -504,26 +772,33 @@ async def admin_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("📭 Hozircha foydalanuvchilar yo'q")
         return
     
-    message = "👥 *Barcha foydalanuvchilar:*\n\n"
+    message = render("👥 *Barcha foydalanuvchilar:*\n\n")
     for user in users[:50]:  # Faqat 50 tasini ko'rsatamiz
-        username = f"@{user['username']}" if user['username'] else "Yo'q"
-        message += (
-            f"🆔 *ID:* `{user['user_id']}`\n"
-            f"👤 *Ism:* {user['first_name']}\n"
-            f"📱 *Username:* {username}\n"
-            f"⏰ *Oxirgi faollik:* {user['last_active'][:19]}\n"
-            f"────────────────────\n"
+        username = f"@{user.username}" if user.username else "Yo'q"
+        message += render(
+            "🆔 *ID:* `{id}`\n"
+            "👤 *Ism:* {name}\n"
+            "📱 *Username:* {username}\n"
+            "⏰ *Oxirgi faollik:* {last_active}\n"
+            "────────────────────\n",
+            id=user.user_id,
+            name=user.first_name,
+            username=username,
+            last_active=str(user.last_active)[:19]
         )
     
     if len(users) > 50:
         message += f"\n... va yana {len(users) - 50} ta foydalanuvchi"
     
-    await update.message.reply_text(message, parse_mode='Markdown')
+    await update.message.reply_text(**message.as_message())
 
 async def admin_chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Barcha chatlar (/chats)"""
     user_id = update.effective_user.id
     
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
     if user_id not in Config.ADMINS:
         await update.message.reply_text("❌ Siz admin emassiz!")
         return
@@ -534,42 +809,166 @@ async def admin_chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("📭 Hozircha chatlar yo'q")
         return
     
-    message = "💬 *Barcha chatlar:*\n\n"
+    names = db.get_display_names(
+        [chat.user1_id for chat in chats[:20]] + [chat.user2_id for chat in chats[:20]]
+    )
+    
+    message = render("💬 *Barcha chatlar:*\n\n")
     for chat in chats[:20]:  # Faqat 20 tasini ko'rsatamiz
-        status = "✅ Faol" if chat['is_active'] else "❌ Tugatilgan"
-        message += (
-            f"🆔 *Chat ID:* `{chat['chat_id']}`\n"
-            f"👤 *User 1:* {chat['user1_name']} (`{chat['user1_id']}`)\n"
-            f"👤 *User 2:* {chat['user2_name']} (`{chat['user2_id']}`)\n"
-            f"📅 *Yaratilgan:* {chat['created_at'][:19]}\n"
-            f"📊 *Holat:* {status}\n"
-            f"────────────────────\n"
+        status = "✅ Faol" if chat.is_active else "❌ Tugatilgan"
+        message += render(
+            "🆔 *Chat ID:* `{chat_id}`\n"
+            "👤 *User 1:* {name1} (`{id1}`)\n"
+            "👤 *User 2:* {name2} (`{id2}`)\n"
+            "📅 *Yaratilgan:* {created_at}\n"
+            "📊 *Holat:* {status}\n"
+            "────────────────────\n",
+            chat_id=chat.chat_id,
+            name1=names.get(chat.user1_id),
+            id1=chat.user1_id,
+            name2=names.get(chat.user2_id),
+            id2=chat.user2_id,
+            created_at=str(chat.created_at)[:19],
+            status=status
         )
     
     if len(chats) > 20:
         message += f"\n... va yana {len(chats) - 20} ta chat"
     
-    await update.message.reply_text(message, parse_mode='Markdown')
+    await update.message.reply_text(**message.as_message())
+
+async def admin_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Xabarlardan qidirish (/search)"""
+    user_id = update.effective_user.id
+    
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
+    if user_id not in Config.ADMINS:
+        await update.message.reply_text("❌ Siz admin emassiz!")
+        return
+    
+    if not context.args:
+        await update.message.reply_text(**render(
+            "🔎 *Qidirish*\n\n"
+            "Foydalanish: `/search <so'zlar>`"
+        ).as_message())
+        return
+    
+    query = ' '.join(context.args)
+    results = db.search_messages(query, limit=Config.SEARCH_RESULTS_LIMIT)
+    
+    if not results:
+        await update.message.reply_text("📭 Hech narsa topilmadi")
+        return
+    
+    names = db.get_display_names([r['sender_id'] for r in results])
+    
+    # Snippetlarda foydalanuvchi matni bor - oddiy matn sifatida yuboramiz
+    message = f"🔎 Natijalar: {query}\n\n"
+    for r in results:
+        message += (
+            f"💬 Chat #{r['chat_id']} | {names.get(r['sender_id'], r['sender_id'])} "
+            f"({r['sender_id']}) | {str(r['sent_at'])[:16]}\n"
+            f"{r['snippet']}\n"
+            f"────────────────────\n"
+        )
+    
+    await update.message.reply_text(message[:Config.MAX_MESSAGE_LENGTH])
+
+def render_bar(value, max_value, width=12):
+    """Matnli grafik uchun ustun"""
+    if not max_value:
+        return ''
+    return '█' * max(1 if value else 0, round(width * value / max_value))
+
+async def admin_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Trendlar (/analytics [kunlar] yoki /analytics <soatlar>h)"""
+    user_id = update.effective_user.id
+    
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
+    if user_id not in Config.ADMINS:
+        await update.message.reply_text("❌ Siz admin emassiz!")
+        return
+    
+    arg = context.args[0].lower() if context.args else ''
+    hourly = arg.endswith('h')
+    number = arg[:-1] if hourly else arg
+    periods = int(number) if number.isdecimal() and int(number) > 0 else (24 if hourly else 14)
+    periods = min(periods, 168 if hourly else 90)
+    
+    db.refresh_rollups()
+    rollups = db.get_rollups(hourly=hourly, periods=periods)
+    
+    if not rollups:
+        await update.message.reply_text("📭 Hozircha ma'lumot yo'q")
+        return
+    
+    totals = {}
+    for metrics in rollups.values():
+        for metric, value in metrics.items():
+            totals[metric] = totals.get(metric, 0) + value
+    
+    max_messages = max(m.get('messages', 0) for m in rollups.values())
+    lines = []
+    for bucket, metrics in rollups.items():
+        label = bucket[11:16] if hourly else bucket[5:]
+        count = metrics.get('messages', 0)
+        lines.append(
+            f"{label} {render_bar(count, max_messages):<12} {count:>5} "
+            f"+{metrics.get('new_users', 0)}👤"
+        )
+    
+    sent = totals.get('invitations_sent', 0)
+    accepted = totals.get('invitations_accepted', 0)
+    rate = f"{accepted * 100 / sent:.0f}%" if sent else "—"
+    period_name = f"{periods} soat" if hourly else f"{periods} kun"
+    
+    message = render(
+        "📈 *Analitika ({period_name}, UTC)*\n\n"
+        "✉️ Xabarlar / 👤 yangi foydalanuvchilar:\n"
+        "```{chart}```\n"
+        "✉️ *Xabarlar:* {messages}\n"
+        "👥 *Yangi foydalanuvchilar:* {new_users}\n"
+        "💑 *Boshlangan chatlar:* {chats_started}\n"
+        "🔚 *Tugagan chatlar:* {chats_ended}\n"
+        "💌 *Takliflar:* {sent} (qabul: {accepted}, {rate})",
+        period_name=period_name,
+        chart='\n'.join(lines),
+        messages=totals.get('messages', 0),
+        new_users=totals.get('new_users', 0),
+        chats_started=totals.get('chats_started', 0),
+        chats_ended=totals.get('chats_ended', 0),
+        sent=sent,
+        accepted=accepted,
+        rate=rate
+    )
+    
+    await update.message.reply_text(**message.as_message())
 
 async def admin_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Xabar yuborish (/broadcast)"""
     user_id = update.effective_user.id
     
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
     if user_id not in Config.ADMINS:
         await update.message.reply_text("❌ Siz admin emassiz!")
         return
     
     if not context.args:
-        await update.message.reply_text(
+        await update.message.reply_text(**render(
             "📢 *Broadcast qilish*\n\n"
             "Foydalanish: `/broadcast <xabar>`\n\n"
-            "Misol: `/broadcast Yangilik! Bot yangilandi!`",
-            parse_mode='Markdown'
-        )
+            "Misol: `/broadcast Yangilik! Bot yangilandi!`"
+        ).as_message())
         return
     
     message = ' '.join(context.args)
-    users = db.get_all_users()
+    users = db.get_all_users(reachable_only=True)
     
     if not users:
         await update.message.reply_text("📭 Foydalanuvchilar topilmadi")
@@ -579,32 +978,53 @@ async def admin_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"📢 {len(users)} ta foydalanuvchiga xabar yuborilmoqda..."
     )
     
-    success = 0
-    failed = 0
+    content = render("📢 *Botdan xabar:*\n\n{message}", message=message).as_message()
+    results = []
     
-    for user in users:
-        try:
-            await context.bot.send_message(
-                chat_id=user['user_id'],
-                text=f"📢 *Botdan xabar:*\n\n{message}",
-                parse_mode='Markdown'
-            )
-            success += 1
-        except:
-            failed += 1
+    # Yuborish pooli to'lmasligi uchun parallel yuborishlar cheklangan
+    for i in range(0, len(users), Config.BROADCAST_CONCURRENCY):
+        batch = users[i:i + Config.BROADCAST_CONCURRENCY]
+        results += await asyncio.gather(*(
+            send_broadcast(context.bot, user.user_id, content) for user in batch
+        ))
     
-    await update.message.reply_text(
-        f"✅ *Broadcast natijasi:*\n\n"
-        f"✅ Muvaffaqiyatli: {success}\n"
-        f"❌ Xatolik: {failed}\n"
-        f"📊 Jami: {len(users)}",
-        parse_mode='Markdown'
-    )
+    success = sum(results)
+    failed = len(results) - success
+    
+    await update.message.reply_text(**render(
+        "✅ *Broadcast natijasi:*\n\n"
+        "✅ Muvaffaqiyatli: {success}\n"
+        "❌ Xatolik: {failed}\n"
+        "📊 Jami: {total}",
+        success=success,
+        failed=failed,
+        total=len(users)
+    ).as_message())
+
+async def send_broadcast(bot, chat_id, content):
+    """Bitta foydalanuvchiga broadcast xabari, flood limitida bir marta qayta urinadi"""
+    for attempt in range(2):
+        try:
+            await bot.send_message(chat_id=chat_id, **content)
+            return True
+        except RetryAfter as e:
+            if attempt:
+                return False
+            await asyncio.sleep(e.retry_after)
+        except Exception as e:
+            # Keyingi broadcastlarda o'tkazib yuboriladi
+            if is_unreachable_error(e):
+                db.set_user_reachable(chat_id, False)
+            return False
+    return False
 
 async def admin_cleanup(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Eski ma'lumotlarni tozalash (/cleanup)"""
     user_id = update.effective_user.id
     
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
     if user_id not in Config.ADMINS:
         await update.message.reply_text("❌ Siz admin emassiz!")
         return
@@ -615,3 +1035,96 @@ async def admin_cleanup(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("✅ Ma'lumotlar muvaffaqiyatli tozalandi!")
     else:
         await update.message.reply_text("❌ Tozalashda xatolik yuz berdi!")
+
+
+async def admin_backup(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Bazaning nusxasini olish (/backup)"""
+    user_id = update.effective_user.id
+    
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
+    if user_id not in Config.ADMINS:
+        await update.message.reply_text("❌ Siz admin emassiz!")
+        return
+    
+    await update.message.reply_text("💾 Backup olinmoqda...")
+    
+    try:
+        path, size, duration = await backup_manager.create_backup()
+        await update.message.reply_text(**render(
+            "✅ *Backup tayyor*\n\n"
+            "📁 *Fayl:* `{path}`\n"
+            "📦 *Hajmi:* {size:.1f} KB\n"
+            "⏱️ *Vaqt:* {duration:.2f}s",
+            path=path,
+            size=size / 1024,
+            duration=duration
+        ).as_message())
+    except Exception as e:
+        logger.error(f"Backup xatosi: {e}")
+        await update.message.reply_text("❌ Backup olishda xatolik yuz berdi!")
+
+async def admin_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Statistik profil olish (/profile <sekund>)"""
+    user_id = update.effective_user.id
+    
+    if not rate_limiter.allow('admin', user_id):
+        return
+    
+    if user_id not in Config.ADMINS:
+        await update.message.reply_text("❌ Siz admin emassiz!")
+        return
+    
+    try:
+        seconds = float(context.args[0]) if context.args else Config.PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        await update.message.reply_text(**render(
+            "Foydalanish: `/profile <sekund>` (maks. {max})",
+            max=Config.PROFILE_MAX_SECONDS
+        ).as_message())
+        return
+    seconds = max(1, min(seconds, Config.PROFILE_MAX_SECONDS))
+    
+    if sampling_profiler.is_running:
+        await update.message.reply_text("⏳ Profil allaqachon olinmoqda")
+        return
+    
+    await update.message.reply_text(f"🔬 {seconds:.0f}s davomida profil olinmoqda...")
+    
+    # Handlerlar ketma-ket ishlaydi: kutish fonda, relay to'xtamaydi
+    context.application.create_task(
+        send_profile(context.bot, update.effective_chat.id, seconds)
+    )
+
+async def send_profile(bot, chat_id, seconds):
+    """Profilni oladi va adminga collapsed-stack fayl sifatida yuboradi"""
+    try:
+        stacks, samples = await sampling_profiler.profile(seconds)
+        own, _ = sampling_profiler.hot_functions(stacks, Config.PROFILE_TOP_N)
+        # Har bir namuna - event loop ning bitta steki, shuning uchun jami 100%
+        total = samples or 1
+        idle = sum(
+            count for stack, count in stacks.items() if sampling_profiler.is_idle(stack)
+        )
+        top = '\n'.join(
+            f"{count / total * 100:5.1f}% {label}" for label, count in own
+        )
+        
+        caption = render(
+            "🔬 *Profil:* {seconds:.0f}s, {samples} namuna, loop band {busy:.1f}%\n\n"
+            "*Eng issiq funksiyalar (self):*\n```{top}```",
+            seconds=seconds,
+            samples=samples,
+            busy=(samples - idle) / total * 100,
+            top=top[:800] or '-'
+        )
+        await bot.send_document(
+            chat_id=chat_id,
+            document=io.BytesIO(sampling_profiler.collapsed(stacks).encode('utf-8')),
+            filename=f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed",
+            **caption.as_caption()
+        )
+    except Exception as e:
+        logger.error(f"Profil olishda xato: {e}")
+        await bot.send_message(chat_id, "❌ Profil olishda xatolik yuz berdi!")
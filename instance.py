@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: handoff qo'llab-quvvatlanmaydi
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class InstanceLock:
+    """Bir vaqtda faqat bitta bot nusxasi polling qilishi uchun fayl qulfi.
+
+    Qulf egasi o'z PID ini faylga yozadi. Handoff rejimida yangi nusxa
+    (hamma narsani oldindan tayyorlab) eski nusxaga SIGTERM yuboradi va u
+    updatelarni tugatib qulfni bo'shatishi bilan polling ni boshlaydi.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.PID_FILE
+        self._file = None
+
+    def _try_lock(self):
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _holder_pid(self):
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    async def acquire(self, handoff=False, timeout=None):
+        """Qulfni oladi. Handoff da eski nusxani to'xtatib, bo'shashini kutadi"""
+        self._file = open(self.path, 'a+')
+        if not self._try_lock():
+            pid = self._holder_pid()
+            if not handoff:
+                logger.error(f"Bot allaqachon ishlayapti (PID {pid})")
+                return self._fail()
+
+            logger.info(f"🔁 Handoff: eski nusxa (PID {pid}) to'xtatilmoqda")
+            if pid:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+            deadline = time.monotonic() + (timeout or Config.HANDOFF_TIMEOUT)
+            while not self._try_lock():
+                if time.monotonic() > deadline:
+                    logger.error("Handoff: eski nusxa vaqtida to'xtamadi")
+                    return self._fail()
+                await asyncio.sleep(0.05)
+
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(str(os.getpid()))
+        self._file.flush()
+        return True
+
+    def _fail(self):
+        self._file.close()
+        self._file = None
+        return False
+
+    def release(self):
+        """Qulfni bo'shatadi (yangi nusxa darhol polling boshlashi mumkin)"""
+        if self._file:
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.close()
+            self._file = None
+
+# Global obyekt
+instance_lock = InstanceLock()
@@ -0,0 +1,233 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from telegram import Update
+from telegram.ext import Application
+from config import Config
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Fayl sarlavhasi: magic, checkpoint (oxirgi to'liq qayta ishlangan update_id)
+HEADER = struct.Struct('<4sq')
+# Yozuv sarlavhasi: payload uzunligi, crc32, update_id, qabul qilingan vaqt
+RECORD = struct.Struct('<IIqd')
+MAGIC = b'SVJ1'
+CURRENT_NAME = 'current.journal'
+
+def read_journal(path):
+    """Jurnal faylidagi yozuvlar: (update_id, vaqt, update dict).
+
+    Uzilib qolgan (crc mos kelmaydigan) yozuvgacha o'qiydi.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        return
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        length, crc, update_id, received = RECORD.unpack_from(data, offset)
+        payload = data[offset + RECORD.size:offset + RECORD.size + length]
+        if length == 0 or len(payload) != length or zlib.crc32(payload) != crc:
+            break
+        yield update_id, received, json.loads(payload)
+        offset += RECORD.size + length
+
+class UpdateJournal:
+    """Kiruvchi updatelar uchun append-only, memory-mapped jurnal.
+
+    Update navbatga qo'yilishidan oldin yoziladi, handlerlar tugagach
+    checkpoint yangilanadi. Jarayon qulab tushsa, ishga tushganda checkpoint dan
+    keyingi yozuvlar qayta ishlanadi. To'liq qayta ishlangan segmentlar
+    arxivlanadi va replay.py orqali offline qayta o'ynatilishi mumkin.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or Config.JOURNAL_DIR
+        self.path = os.path.join(self.directory, CURRENT_NAME)
+        self._file = None
+        self._mm = None
+        self._offset = HEADER.size
+        self._last_id = -1
+        self._checkpoint = -1
+
+    @property
+    def is_open(self):
+        return self._mm is not None
+
+    @property
+    def last_update_id(self):
+        """Jurnalga tushgan oxirgi update_id (checkpoint bilan birga)"""
+        return max(self._last_id, self._checkpoint)
+
+    def open(self):
+        """Joriy segmentni ochadi va oxirgi to'g'ri yozuvni topadi"""
+        os.makedirs(self.directory, exist_ok=True)
+        exists = os.path.exists(self.path)
+        self._file = open(self.path, 'r+b' if exists else 'w+b')
+        if os.fstat(self._file.fileno()).st_size < Config.JOURNAL_SEGMENT_SIZE:
+            self._file.truncate(Config.JOURNAL_SEGMENT_SIZE)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+        magic, checkpoint = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            HEADER.pack_into(self._mm, 0, MAGIC, self._checkpoint)
+            checkpoint = self._checkpoint
+        self._checkpoint = checkpoint
+
+        # Oxirgi butun yozuvgacha yuramiz
+        self._offset = HEADER.size
+        for update_id, _, _ in read_journal(self.path):
+            length = RECORD.unpack_from(self._mm, self._offset)[0]
+            self._offset += RECORD.size + length
+            self._last_id = update_id
+
+        logger.info(
+            f"Jurnal ochildi: {self.path} (checkpoint {self._checkpoint}, "
+            f"oxirgi update {self._last_id})"
+        )
+
+    def close(self):
+        """Jurnalni diskka yozib yopadi"""
+        if self._mm:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def append(self, update):
+        """Updateni jurnal oxiriga yozadi"""
+        if not self.is_open:
+            return
+        if update.update_id <= self.last_update_id:
+            self._restart_sequence(update.update_id)
+        payload = update.to_json().encode('utf-8')
+        size = RECORD.size + len(payload)
+        if self._offset + size > len(self._mm):
+            self._grow(self._offset + size)
+
+        # Avval payload, keyin sarlavha: yarim yozilgan yozuvning uzunligi 0 bo'lib qoladi
+        start = self._offset + RECORD.size
+        self._mm[start:start + len(payload)] = payload
+        RECORD.pack_into(
+            self._mm, self._offset,
+            len(payload), zlib.crc32(payload), update.update_id, time.time()
+        )
+        self._offset += size
+        self._last_id = max(self._last_id, update.update_id)
+
+    def commit(self, update_id):
+        """Update handlerlari tugadi - checkpoint ni yangilaydi"""
+        # update_id > _last_id: ketma-ketlik qayta boshlanishidan oldingi update
+        if not self.is_open or update_id <= self._checkpoint or update_id > self._last_id:
+            return
+        self._checkpoint = update_id
+        HEADER.pack_into(self._mm, 0, MAGIC, update_id)
+
+        # Hamma yozuvlar qayta ishlangan bo'lsa segmentni arxivlash mumkin
+        if update_id >= self._last_id and self._offset >= Config.JOURNAL_ROTATE_SIZE:
+            self._rotate()
+
+    def _restart_sequence(self, update_id):
+        """Telegram update_id ni kichikroq qiymatdan qayta boshladi.
+        
+        Bir hafta update bo'lmasa (yoki jurnal boshqa token bilan ishlatilsa)
+        id lar tasodifiy qiymatdan boshlanadi. Eski segment arxivlanadi va
+        checkpoint yangi ketma-ketlikka tushiriladi, aks holda commit va
+        replay yangi updatelarni "allaqachon ishlangan" deb hisoblardi.
+        """
+        logger.warning(
+            f"update_id ketma-ketligi qayta boshlandi: {self.last_update_id} -> {update_id}"
+        )
+        self._checkpoint = update_id - 1
+        self._last_id = -1
+        if self._offset > HEADER.size:
+            self._rotate()
+        else:
+            HEADER.pack_into(self._mm, 0, MAGIC, self._checkpoint)
+
+    def pending_updates(self, bot):
+        """Checkpoint dan keyingi (qayta ishlanmagan) updatelar"""
+        if not self.is_open:
+            return []
+        self._mm.flush()
+        return [
+            Update.de_json(data, bot)
+            for update_id, _, data in read_journal(self.path)
+            if update_id > self._checkpoint
+        ]
+
+    def recent_update_ids(self, limit):
+        """Oxirgi `limit` ta jurnallangan update_id (oxirgi arxiv va joriy segmentdan).
+        
+        Oldingi jarayon tasdiqlay olmagan partiya qayta kelsa shular bilan tanib olinadi.
+        """
+        recent = deque(maxlen=limit)
+        archives = self._archives()[-1:]
+        if self.is_open:
+            self._mm.flush()
+        for path in [os.path.join(self.directory, name) for name in archives] + [self.path]:
+            if os.path.exists(path):
+                recent.extend(update_id for update_id, _, _ in read_journal(path))
+        return list(recent)
+    
+    def _archives(self):
+        """Arxivlangan segmentlar (eskidan yangiga)"""
+        return sorted(
+            f for f in os.listdir(self.directory)
+            if f.startswith('journal-') and f.endswith('.log')
+        )
+
+    def _grow(self, needed):
+        size = len(self._mm)
+        while size < needed:
+            size *= 2
+        self._mm.flush()
+        self._mm.close()
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _rotate(self):
+        self.close()
+        archive = os.path.join(
+            self.directory, f"journal-{datetime.now().strftime('%Y%m%d-%H%M%S')}.log"
+        )
+        # Arxivda bo'sh (oldindan ajratilgan) joy kerak emas
+        with open(self.path, 'r+b') as f:
+            f.truncate(self._offset)
+        os.replace(self.path, archive)
+        logger.info(f"Jurnal arxivlandi: {archive}")
+
+        for name in self._archives()[:-Config.JOURNAL_KEEP]:
+            os.remove(os.path.join(self.directory, name))
+
+        self._offset = HEADER.size
+        self.open()
+
+class JournaledApplication(Application):
+    """Handlerlar tugagach jurnal checkpoint ini yangilaydigan Application"""
+
+    async def process_update(self, update):
+        try:
+            if isinstance(update, Update):
+                # Trace shu yerda boshlanadi: handler, database va Bot API spanlari ichida
+                with tracer.trace('update', update_id=update.update_id) as span:
+                    if span and update.effective_user:
+                        span.set('user_id', update.effective_user.id)
+                    await super().process_update(update)
+            else:
+                await super().process_update(update)
+        finally:
+            if isinstance(update, Update):
+                update_journal.commit(update.update_id)
+
+# Global jurnal (bot ishga tushganda ochiladi)
+update_journal = UpdateJournal()
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def project_frames(frame):
+    """Stekdagi faqat loyiha fayllariga tegishli kadrlar (tashqidan ichkariga)"""
+    return [
+        f"{os.path.splitext(os.path.basename(entry.filename))[0]}.{entry.name}:{entry.lineno}"
+        for entry in traceback.extract_stack(frame)
+        if entry.filename.startswith(PROJECT_DIR)
+    ]
+
+class LoopWatchdog:
+    """Event loop bloklanishini o'lchaydi va aybdorni topadi.
+
+    Loop ichidagi probe har `interval` da uxlaydi va kechikishni (lag) yozadi.
+    Yordamchi thread heartbeat ni kuzatadi: loop `threshold` dan ko'p javob
+    bermasa, loop threadining stekini oladi - shu paytda qaysi handler yoki
+    Database metodi ishlayotgani logga yoziladi.
+    """
+
+    def __init__(self, interval=None, threshold=None, samples=None):
+        self.interval = interval or Config.WATCHDOG_INTERVAL
+        self.threshold = threshold or Config.WATCHDOG_THRESHOLD
+        self._lags = deque(maxlen=samples or Config.WATCHDOG_SAMPLES)
+        self._heartbeat = time.monotonic()
+        self._loop_thread = None
+        self._stall_stack = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    async def start(self):
+        """Probe va kuzatuvchi threadni ishga tushiradi"""
+        if not self.interval:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """Kuzatishni to'xtatadi"""
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _probe(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(0.0, now - expected)
+            self._lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            stack, self._stall_stack = self._stall_stack, None
+            if lag >= self.threshold:
+                self.stalls += 1
+                culprit = ' -> '.join(stack) if stack else "noma'lum (stek olinmadi)"
+                logger.warning(f"Event loop {lag * 1000:.0f}ms bloklandi: {culprit}")
+
+    def _watch(self):
+        """Yordamchi thread: loop javob bermay qolganda stekni oladi"""
+        while not self._stopping.wait(self.interval / 2):
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.threshold or self._stall_stack is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                # Loop hali ham shu joyda turibdi - ayni shu kod bloklayapti
+                self._stall_stack = project_frames(frame) or [
+                    f"{os.path.basename(entry.filename)}:{entry.name}:{entry.lineno}"
+                    for entry in traceback.extract_stack(frame)[-3:]
+                ]
+
+    def get_stats(self):
+        """Lag persentillari (millisekundda)"""
+        lags = sorted(self._lags)
+
+        def percentile(p):
+            if not lags:
+                return 0.0
+            return lags[min(len(lags) - 1, int(len(lags) * p))] * 1000
+
+        return {
+            'samples': len(lags),
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': self.max_lag * 1000,
+            'stalls': self.stalls,
+        }
+
+# Global obyekt
+loop_watchdog = LoopWatchdog()
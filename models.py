@@ -0,0 +1,64 @@
+from collections import namedtuple
+
+def row_model(model):
+    """Modelga tez row factory va SELECT ustunlarini qo'shadi.
+
+    Qator to'g'ridan-to'g'ri tuple.__new__ bilan yaratiladi (namedtuple._make
+    kabi, lekin Python __init__ siz). Ustunlar tartibi modeldagi bilan bir xil
+    bo'lishi uchun so'rovlar `SELECT *` emas, `model.COLUMNS` ishlatadi.
+    """
+    new = tuple.__new__
+
+    def from_row(cursor, row):
+        return new(model, row)
+
+    model.from_row = staticmethod(from_row)
+    model.COLUMNS = ', '.join(model._fields)
+    return model
+
+@row_model
+class User(namedtuple('User', (
+    'user_id', 'username', 'first_name', 'last_name',
+    'created_at', 'last_active', 'unreachable_at'
+))):
+    """users jadvali qatori"""
+    __slots__ = ()
+    TABLE = 'users'
+
+    @property
+    def profile(self):
+        """Keshdagi ko'rinish: (username, first_name, last_name)"""
+        return (self.username, self.first_name, self.last_name)
+
+@row_model
+class Chat(namedtuple('Chat', (
+    'chat_id', 'user1_id', 'user2_id', 'created_at', 'ended_at', 'is_active'
+))):
+    """chats jadvali qatori"""
+    __slots__ = ()
+    TABLE = 'chats'
+
+    def partner_of(self, user_id):
+        """Chatdagi ikkinchi foydalanuvchi"""
+        return self.user2_id if self.user1_id == user_id else self.user1_id
+
+    def has_member(self, user_id):
+        return user_id == self.user1_id or user_id == self.user2_id
+
+@row_model
+class Invitation(namedtuple('Invitation', (
+    'invitation_id', 'sender_id', 'receiver_id', 'status',
+    'created_at', 'responded_at', 'message_id'
+))):
+    """invitations jadvali qatori"""
+    __slots__ = ()
+    TABLE = 'invitations'
+
+@row_model
+class Message(namedtuple('Message', (
+    'message_id', 'chat_id', 'sender_id', 'message_type',
+    'content', 'file_id', 'sent_at'
+))):
+    """messages jadvali qatori"""
+    __slots__ = ()
+    TABLE = 'messages'
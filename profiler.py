@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Event loop hech narsa qilmay kutayotgan kadrlar (selector.select)
+IDLE_MODULES = ('selectors',)
+
+def frame_label(code):
+    """Kadr nomi: modul:funksiya"""
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+class SamplingProfiler:
+    """Ishlayotgan jarayon uchun statistik profiler.
+
+    Alohida thread har `interval` da event loop threadining stekini oladi
+    (sys._current_frames). Boshqa threadlar (to_thread ishchilari,
+    watchdog) olinmaydi: ular asosan kutadi va loopni bloklamaydi, shuning
+    uchun har bir namuna bitta stek va foizlar 100% dan oshmaydi. Kod
+    instrumentatsiya qilinmaydi, relay deyarli sekinlashmaydi. Natija -
+    collapsed-stack format (flamegraph.pl / speedscope uchun) va eng
+    "issiq" funksiyalar.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or Config.PROFILE_INTERVAL
+        self._running = False
+
+    @property
+    def is_running(self):
+        return self._running
+
+    async def profile(self, seconds):
+        """`seconds` davomida loop stekidan namunalar: (steklar Counter, namunalar soni)"""
+        if self._running:
+            raise RuntimeError("Profiler allaqachon ishlayapti")
+        self._running = True
+        try:
+            # Event loop threadi - to_thread dan oldin aniqlanadi
+            loop_thread = threading.get_ident()
+            return await asyncio.to_thread(self._sample, seconds, loop_thread)
+        finally:
+            self._running = False
+
+    def _sample(self, seconds, thread_id):
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        name = next(
+            (t.name for t in threading.enumerate() if t.ident == thread_id), str(thread_id)
+        )
+
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(name)
+            stacks[tuple(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        return stacks, samples
+
+    @staticmethod
+    def collapsed(stacks):
+        """Collapsed-stack matni: 'thread;f1;f2 soni' qatorlari"""
+        return ''.join(
+            f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common()
+        )
+
+    @staticmethod
+    def is_idle(stack):
+        """Loop selector da kutayotgan namuna"""
+        return stack[-1].split(':', 1)[0] in IDLE_MODULES
+
+    @classmethod
+    def hot_functions(cls, stacks, top=10):
+        """(self, inclusive) bo'yicha eng ko'p uchragan funksiyalar (kutishlarsiz)"""
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in stacks.items():
+            if cls.is_idle(stack):
+                continue
+            # stack[0] - thread nomi
+            if len(stack) > 1:
+                own[stack[-1]] += count
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        return own.most_common(top), inclusive.most_common(top)
+
+# Global obyekt
+sampling_profiler = SamplingProfiler()
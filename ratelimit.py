@@ -0,0 +1,86 @@
+import logging
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Har bir foydalanuvchi uchun token bucket (flooddan himoya).
+
+    Har bir limit (xabar, taklif, admin) uchun alohida lug'at saqlanadi:
+    user_id -> (tokenlar, oxirgi yangilanish). Bucket to'lib qolgan yoki uzoq
+    vaqt ishlatilmagan yozuvlar vaqti-vaqti bilan o'chiriladi.
+    """
+
+    def __init__(self, limits=None, idle_ttl=None):
+        self.limits = limits or Config.RATE_LIMITS
+        self.idle_ttl = idle_ttl or Config.RATE_LIMIT_IDLE_TTL
+        self._buckets = {name: {} for name in self.limits}
+        self.dropped = {name: 0 for name in self.limits}
+        # (limit, user_id) -> oxirgi ogohlantirish vaqti
+        self._notified = {}
+        self._last_sweep = time.monotonic()
+
+    def allow(self, name, user_id, cost=1.0):
+        """Token bo'lsa True, aks holda update tashlab yuboriladi (False)"""
+        rate, burst = self.limits[name]
+        buckets = self._buckets[name]
+        now = time.monotonic()
+
+        state = buckets.get(user_id)
+        if state is None:
+            tokens = burst
+        else:
+            tokens = min(burst, state[0] + (now - state[1]) * rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        else:
+            self.dropped[name] += 1
+            logger.debug(f"Limitdan oshdi ({name}): {user_id}")
+
+        buckets[user_id] = (tokens, now)
+        self._maybe_sweep(now)
+        return allowed
+
+    def should_notify(self, name, user_id):
+        """Limitga urilgan foydalanuvchini ogohlantirish kerakmi (interval ichida bir marta)"""
+        now = time.monotonic()
+        key = (name, user_id)
+        last = self._notified.get(key)
+        if last is not None and now - last < Config.RATE_LIMIT_NOTICE_INTERVAL:
+            return False
+        self._notified[key] = now
+        return True
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep < self.idle_ttl:
+            return
+        self._last_sweep = now
+
+        self._notified = {
+            key: notified for key, notified in self._notified.items()
+            if now - notified < Config.RATE_LIMIT_NOTICE_INTERVAL
+        }
+
+        for name, buckets in self._buckets.items():
+            rate, burst = self.limits[name]
+            idle = [
+                user_id for user_id, (tokens, updated) in buckets.items()
+                if now - updated >= self.idle_ttl
+                or tokens + (now - updated) * rate >= burst
+            ]
+            for user_id in idle:
+                del buckets[user_id]
+
+    def get_stats(self):
+        """Monitoring uchun: tashlab yuborilgan updatelar va kuzatilayotganlar"""
+        return {
+            'dropped': dict(self.dropped),
+            'dropped_total': sum(self.dropped.values()),
+            'tracked_users': sum(len(b) for b in self._buckets.values()),
+        }
+
+# Global obyekt
+rate_limiter = RateLimiter()
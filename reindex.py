@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Qidiruv indeksini (FTS5) qayta qurish
+
+Mavjud bazada xabarlar indeksdan tashqarida qolgan bo'lsa ishlatiladi:
+    python reindex.py
+"""
+
+import logging
+import sys
+
+from database import db
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+
+def main():
+    """Asosiy funksiya"""
+    ok = db.open() and db.fts_enabled and db.rebuild_search_index()
+    db.close()
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import logging
+from collections import OrderedDict
+from config import Config
+from database import db
+
+logger = logging.getLogger(__name__)
+
+class RelayMap:
+    """Yuborilgan xabar va uning sherikdagi nusxasi o'rtasidagi bog'lanish.
+
+    Kalit - (user_id, message_id): foydalanuvchi o'z chatida ko'rgan xabar,
+    qiymat - (partner_message_id, db_message_id). Har bir chat uchun alohida
+    LRU (eng yangi RELAY_MAP_PER_CHAT ta xabar), shuning uchun javob va
+    tahrirlarda qidirish O(1). Keshda yo'q bo'lsa (qayta ishga tushgandan
+    keyin) relay_map jadvalidan olinadi.
+    """
+
+    def __init__(self, per_chat=None):
+        self.per_chat = per_chat or Config.RELAY_MAP_PER_CHAT
+        # chat_id -> OrderedDict((user_id, message_id) -> (partner_message_id, db_message_id))
+        self._chats = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _put(self, chat_id, key, value):
+        entries = self._chats.get(chat_id)
+        if entries is None:
+            entries = self._chats[chat_id] = OrderedDict()
+        entries[key] = value
+        entries.move_to_end(key)
+        # Har bir xabar ikki yo'nalishda yoziladi
+        while len(entries) > self.per_chat * 2:
+            entries.popitem(last=False)
+
+    def record(self, chat_id, user_id, message_id, partner_id, partner_message_id,
+               message_type, content, file_id=None):
+        """Xabarni bazaga saqlaydi va ikki tomondagi nusxalarni bog'laydi"""
+        db_message_id = db.add_relayed_message(
+            chat_id, user_id, partner_id, message_type, content, file_id,
+            message_id, partner_message_id
+        )
+        self._put(chat_id, (user_id, message_id), (partner_message_id, db_message_id))
+        self._put(chat_id, (partner_id, partner_message_id), (message_id, db_message_id))
+        return db_message_id
+
+    def lookup(self, chat_id, user_id, message_id):
+        """user_id chatidagi xabarning sherikdagi nusxasi: (partner_message_id, db_message_id)"""
+        key = (user_id, message_id)
+        entries = self._chats.get(chat_id)
+        if entries is not None:
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        value = db.get_relayed(chat_id, user_id, message_id)
+        if value is not None:
+            self._put(chat_id, key, value)
+        return value
+
+    def forget(self, chat_id):
+        """Tugagan chat keshini bo'shatadi (jadvaldagisi end_chat da o'chadi)"""
+        self._chats.pop(chat_id, None)
+
+    def get_stats(self):
+        return {
+            'chats': len(self._chats),
+            'entries': sum(len(entries) for entries in self._chats.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+# Global obyekt
+relay_map = RelayMap()
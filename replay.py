@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Jurnaldagi updatelarni offline qayta o'ynatish (debug va benchmark)
+
+Updatelar haqiqiy handlerlar orqali o'tadi, lekin Bot API o'rniga soxta
+so'rovlar ishlatiladi va alohida baza ishlatiladi:
+    python replay.py journal/journal-20261019-*.log --database replay.db
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import Counter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Update jurnalini qayta o'ynatish")
+    parser.add_argument('journals', nargs='+', help="jurnal fayllari (vaqt tartibida)")
+    parser.add_argument('--database', default=':memory:',
+                        help="replay uchun baza (standart: xotirada)")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="asl vaqt oraliqlarini tezlashtirish (0 - imkon qadar tez)")
+    parser.add_argument('--no-limits', action='store_true',
+                        help="flood limitlarini o'chirish (benchmark uchun)")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser.parse_args()
+
+def make_fake_request():
+    """Bot API o'rniga javob qaytaradigan soxta so'rov klassi"""
+    from telegram.request import BaseRequest
+
+    class FakeRequest(BaseRequest):
+        def __init__(self):
+            self.calls = Counter()
+            self._message_id = 0
+
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None,
+                             write_timeout=None, connect_timeout=None, pool_timeout=None):
+            endpoint = url.rsplit('/', 1)[-1]
+            self.calls[endpoint] += 1
+            params = request_data.parameters if request_data else {}
+            chat = {'id': params.get('chat_id', 1), 'type': 'private', 'first_name': 'Replay'}
+
+            if endpoint == 'getMe':
+                result = {'id': 1, 'is_bot': True, 'first_name': 'Replay',
+                          'username': 'replay_bot'}
+            elif endpoint == 'getChat':
+                result = chat
+            elif endpoint.startswith(('send', 'edit', 'copy', 'forward')):
+                self._message_id += 1
+                result = {'message_id': self._message_id, 'date': int(time.time()),
+                          'chat': chat}
+            else:
+                result = True
+
+            return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+    return FakeRequest()
+
+async def replay(args):
+    # Replay alohida bazada (db.open() da ochiladi)
+    Config.DATABASE = args.database
+
+    from telegram import Update
+    from telegram.ext import Application
+    from journal import read_journal
+    from ratelimit import rate_limiter
+    from bot import SevishganlarBot
+    from database import db
+    
+    db.open()
+
+    if args.no_limits:
+        rate_limiter.limits = {name: (float('inf'), float('inf')) for name in rate_limiter.limits}
+
+    request = make_fake_request()
+    application = (
+        Application.builder()
+        .token('1:REPLAY')
+        .request(request)
+        .get_updates_request(make_fake_request())
+        .build()
+    )
+    SevishganlarBot.register_handlers(application)
+    await application.initialize()
+
+    count = 0
+    previous = None
+    started = time.perf_counter()
+    for path in args.journals:
+        for update_id, received, data in read_journal(path):
+            if args.speed and previous is not None:
+                await asyncio.sleep(max(0, received - previous) / args.speed)
+            previous = received
+
+            await application.process_update(Update.de_json(data, application.bot))
+            count += 1
+
+    elapsed = time.perf_counter() - started
+    await application.shutdown()
+    db.close()
+
+    print(f"Updatelar: {count}")
+    print(f"Vaqt: {elapsed:.3f}s ({count / elapsed if elapsed else 0:.1f} update/s)")
+    print("Bot API chaqiruvlari:")
+    for endpoint, calls in request.calls.most_common():
+        print(f"  {endpoint}: {calls}")
+
+def main():
+    """Asosiy funksiya"""
+    args = parse_args()
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO if args.verbose else logging.WARNING
+    )
+    asyncio.run(replay(args))
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
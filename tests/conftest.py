@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database import db
+
+
+@pytest.fixture
+def database():
+    """Har bir test uchun xotiradagi toza baza"""
+    Config.DATABASE = ':memory:'
+    db.close()
+    assert db.open()
+    yield db
+    db.close()
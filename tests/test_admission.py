@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from telegram import Chat, Message, Update, User
+
+import bot as bot_module
+from admission import AdmissionQueue
+from journal import UpdateJournal
+
+
+def make_update(update_id):
+    user = User(101, 'Ali', False)
+    message = Message(
+        update_id, datetime.now(timezone.utc), Chat(101, 'private'),
+        from_user=user, text='salom'
+    )
+    return Update(update_id, message=message)
+
+
+def admitted(queue, update_ids):
+    async def put_all():
+        for update_id in update_ids:
+            await queue.put(make_update(update_id))
+    asyncio.run(put_all())
+    return queue.admitted
+
+
+def test_redelivered_updates_are_dropped(tmp_path):
+    journal = UpdateJournal(str(tmp_path))
+    journal.open()
+    for update_id in range(100, 106):
+        journal.append(make_update(update_id))
+
+    queue = AdmissionQueue(maxsize=100)
+    assert queue.seed(journal.recent_update_ids(queue.dedup_size)) == 6
+    journal.close()
+
+    assert admitted(queue, [104, 105, 106]) == 1
+    assert queue.dropped['duplicate'] == 2
+
+
+def test_lower_update_ids_after_reset_are_admitted(tmp_path):
+    # Uzoq tanaffusdan keyin Telegram update_id ni kichikroq qiymatdan boshlashi mumkin
+    journal = UpdateJournal(str(tmp_path))
+    journal.open()
+    journal.append(make_update(5000))
+    journal.commit(5000)
+
+    queue = AdmissionQueue(maxsize=100)
+    queue.seed(journal.recent_update_ids(queue.dedup_size))
+    journal.close()
+
+    assert admitted(queue, [17, 18, 19]) == 3
+    assert queue.dropped['duplicate'] == 0
+
+
+def test_journal_follows_update_id_reset(tmp_path):
+    journal = UpdateJournal(str(tmp_path))
+    journal.open()
+    journal.append(make_update(5000))
+    journal.commit(5000)
+
+    # Telegram ketma-ketlikni kichikroq qiymatdan boshladi
+    journal.append(make_update(17))
+    journal.append(make_update(18))
+    journal.commit(17)
+    assert [update.update_id for update in journal.pending_updates(None)] == [18]
+
+    # Reset dan oldingi (kechikkan) commit checkpoint ni yuqoriga sakratmaydi
+    journal.commit(5000)
+    journal.close()
+
+    journal = UpdateJournal(str(tmp_path))
+    journal.open()
+    assert [update.update_id for update in journal.pending_updates(None)] == [18]
+    journal.close()
+
+
+def test_offset_confirms_last_received_id(monkeypatch):
+    queue = AdmissionQueue(maxsize=100)
+    monkeypatch.setattr(bot_module, 'update_queue', queue)
+    instance = bot_module.SevishganlarBot()
+    instance.application = SimpleNamespace(bot=AsyncMock())
+
+    asyncio.run(instance.confirm_offset())
+    instance.application.bot.get_updates.assert_not_called()
+
+    admitted(queue, [17, 18])
+    asyncio.run(instance.confirm_offset())
+    assert instance.application.bot.get_updates.await_args.kwargs['offset'] == 19
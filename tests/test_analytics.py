@@ -0,0 +1,26 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from telegram import Chat, Message, Update, User
+
+import handlers
+from config import Config
+
+
+@pytest.mark.parametrize('arg', ['²', '³h', '0', '-5', 'abc', '٣'])
+def test_analytics_accepts_any_period_argument(database, arg):
+    admin = Config.ADMINS[0]
+    message = Message(
+        1, datetime.now(timezone.utc), Chat(admin, 'private'),
+        from_user=User(admin, 'Admin', False), text=f'/analytics {arg}'
+    )
+    bot = AsyncMock()
+    message.set_bot(bot)
+    context = SimpleNamespace(bot=bot, args=[arg])
+
+    asyncio.run(handlers.admin_analytics(Update(1, message=message), context))
+
+    bot.send_message.assert_called_once()
@@ -0,0 +1,53 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from backup import BackupManager
+from config import Config
+from database import db
+
+
+@pytest.fixture
+def file_database(tmp_path):
+    previous = Config.DATABASE
+    Config.DATABASE = str(tmp_path / 'bot.db')
+    db.close()
+    assert db.open()
+    yield db
+    db.close()
+    Config.DATABASE = previous
+
+
+def count_chats(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM chats').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_skips_uncommitted_writes(file_database, tmp_path):
+    file_database.create_chat(101, 202)
+    manager = BackupManager(directory=str(tmp_path / 'backups'), keep=5)
+
+    async def backup_during_transaction():
+        with file_database.transaction() as cursor:
+            cursor.execute('INSERT INTO chats (user1_id, user2_id) VALUES (303, 404)')
+            return await manager.create_backup()
+
+    path, _, _ = asyncio.run(backup_during_transaction())
+
+    assert count_chats(path) == 1
+    assert count_chats(Config.DATABASE) == 2
+
+
+def test_backups_in_same_second_do_not_overwrite(file_database, tmp_path):
+    manager = BackupManager(directory=str(tmp_path / 'backups'), keep=5)
+
+    async def two_backups():
+        return await manager.create_backup(), await manager.create_backup()
+
+    first, second = asyncio.run(two_backups())
+    assert first[0] != second[0]
+    assert len(list((tmp_path / 'backups').iterdir())) == 2
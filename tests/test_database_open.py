@@ -0,0 +1,36 @@
+import pytest
+
+from config import Config
+from database import Database, db
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    previous = Config.DATABASE
+    Config.DATABASE = str(tmp_path / 'bot.db')
+    db.close()
+    yield Config.DATABASE
+    db.close()
+    Config.DATABASE = previous
+
+
+def test_open_fails_when_schema_cannot_be_created(file_path, monkeypatch):
+    monkeypatch.setattr(Database, 'create_tables', lambda self: False)
+    assert db.open() is False
+    assert not db.is_open
+
+
+def test_missing_search_index_is_retried_on_open(file_path):
+    assert db.open()
+    # Oldingi ishga tushishda FTS5 yaratilmagan, lekin sxema versiyasi oshgan
+    for trigger in ('insert', 'delete', 'update'):
+        db.conn.execute(f'DROP TRIGGER trg_messages_fts_{trigger}')
+    db.conn.execute('DROP TABLE messages_fts')
+    db.conn.commit()
+    db.close()
+
+    assert db.open()
+    assert db.fts_enabled
+    chat_id = db.create_chat(101, 202)
+    db.add_message(chat_id, 101, 'text', 'salom dunyo')
+    assert db.search_messages('dunyo')
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from datatool import InvariantError, deferred_indexes, import_table
+
+
+def write_chats(path, chats):
+    with open(path, 'w', encoding='utf-8') as f:
+        for chat_id, user1_id, user2_id in chats:
+            f.write(json.dumps({
+                'chat_id': chat_id, 'user1_id': user1_id, 'user2_id': user2_id, 'is_active': 1
+            }) + '\n')
+
+
+def schema(conn):
+    return set(conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name = 'chats'"
+    ).fetchall())
+
+
+def test_import_rebuilds_indexes(database, tmp_path):
+    conn = database.conn
+    conn.commit()
+    before = schema(conn)
+    path = tmp_path / 'chats.jsonl'
+    write_chats(path, [(1, 101, 202), (2, 303, 404)])
+
+    with deferred_indexes(conn, ['chats']):
+        import_table(conn, 'chats', str(path), 'jsonl', batch_size=1)
+
+    assert schema(conn) == before
+    assert conn.execute('SELECT COUNT(*) FROM chats').fetchone()[0] == 2
+
+
+def test_import_breaking_invariants_is_rolled_back(database, tmp_path):
+    conn = database.conn
+    conn.commit()
+    before = schema(conn)
+    path = tmp_path / 'chats.jsonl'
+    # 101 ikkita faol chatda - idx_chats_active_user1 qayta yaratilmaydi
+    write_chats(path, [(1, 101, 202), (2, 101, 303)])
+
+    with pytest.raises(InvariantError) as raised:
+        with deferred_indexes(conn, ['chats']):
+            import_table(conn, 'chats', str(path), 'jsonl', batch_size=1)
+
+    assert 'idx_chats_active_user1' in str(raised.value)
+    assert schema(conn) == before
+    assert conn.execute('SELECT COUNT(*) FROM chats').fetchone()[0] == 0
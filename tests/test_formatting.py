@@ -0,0 +1,131 @@
+import random
+from datetime import datetime, timezone
+from string import Formatter
+
+import pytest
+from telegram import Chat, Message, MessageEntity, User
+
+from config import Config
+from formatting import Formatted, bold, code, render, user_text, utf16_len
+from handlers import relay_text
+
+SEED = 20261019
+ROUNDS = 500
+
+# Markdown/HTML maxsus belgilari, emoji (surrogate juftliklar), birikuvchi belgilar
+ALPHABET = (
+    list("abc xyz 019\n\t") +
+    list("*_`[]()~>#+-=|{}.!\\<>&\"'") +
+    ['```', '**', '__', '{name}', '{{', '}}', '<b>', '</b>', '&amp;'] +
+    ['😀', '👍🏽', '👨‍👩‍👧', '🇺🇿', '𝔘', '\U0010ffff'] +
+    ['́', '̈', '‍', '️', 'é', 'ğ', 'ў', 'ق']
+)
+
+
+def random_text(rng):
+    kind = rng.random()
+    if kind < 0.05:
+        return ''
+    if kind < 0.1:
+        # Telegram chegarasidan uzun matn
+        size = Config.MAX_MESSAGE_LENGTH + rng.randint(1, 500)
+    else:
+        size = rng.randint(1, 60)
+    return ''.join(rng.choice(ALPHABET) for _ in range(size))
+
+
+def random_entities(rng, text):
+    """Telegram yuboradigandek, kod birligi chegaralaridagi entitylar"""
+    boundaries = utf16_boundaries(text)
+    entities = []
+    for _ in range(rng.randint(0, 3)):
+        if len(boundaries) < 2:
+            break
+        start, end = sorted(rng.sample(boundaries, 2))
+        entity_type = rng.choice([MessageEntity.BOLD, MessageEntity.ITALIC, MessageEntity.CODE])
+        entities.append(MessageEntity(entity_type, start, end - start))
+    return entities
+
+
+def utf16_boundaries(text):
+    boundaries = [0]
+    for char in text:
+        boundaries.append(boundaries[-1] + utf16_len(char))
+    return boundaries
+
+
+def random_message(rng):
+    text = random_text(rng)
+    user = User(101, 'Ali', False)
+    chat = Chat(101, 'private')
+    date = datetime.now(timezone.utc)
+    if rng.random() < 0.5:
+        return Message(1, date, chat, from_user=user, text=text,
+                       entities=random_entities(rng, text))
+    return Message(1, date, chat, from_user=user, caption=text,
+                   caption_entities=random_entities(rng, text))
+
+
+def assert_valid(formatted):
+    assert isinstance(formatted, Formatted)
+    total = utf16_len(formatted.text)
+    boundaries = set(utf16_boundaries(formatted.text))
+    for entity in formatted.entities:
+        assert entity.offset >= 0
+        assert entity.length > 0
+        assert entity.offset + entity.length <= total
+        # Surrogate juftlik o'rtasidan boshlanmaydi va tugamaydi
+        assert entity.offset in boundaries
+        assert entity.offset + entity.length in boundaries
+
+    # parse_mode yo'q: matn hech qachon Markdown/HTML sifatida o'qilmaydi
+    assert 'parse_mode' not in formatted.as_message()
+    assert 'parse_mode' not in formatted.as_caption()
+
+
+@pytest.fixture
+def rng():
+    return random.Random(SEED)
+
+
+def test_utf16_len_counts_surrogate_pairs():
+    assert utf16_len('') == 0
+    assert utf16_len('abc') == 3
+    assert utf16_len('😀') == 2
+    assert utf16_len('é') == 2
+
+
+def test_styled_values(rng):
+    for _ in range(ROUNDS):
+        text = random_text(rng)
+        assert_valid(bold(text))
+        assert_valid(code(text))
+        assert_valid(text + bold(text) + code(text))
+
+
+@pytest.mark.parametrize('key', sorted(Config.MESSAGES))
+def test_render_messages_with_random_values(rng, key):
+    template = Config.MESSAGES[key]
+    fields = {field for _, field, _, _ in Formatter().parse(template) if field}
+    for _ in range(ROUNDS // 10):
+        values = {field: random_text(rng) for field in fields}
+        formatted = render(template, **values)
+        assert_valid(formatted)
+        for value in values.values():
+            assert value in formatted.text
+
+
+def test_user_text_keeps_entities(rng):
+    for _ in range(ROUNDS):
+        message = random_message(rng)
+        formatted = user_text(message)
+        assert_valid(formatted)
+        assert formatted.text == (message.text or message.caption or '')
+
+
+def test_relay_text(rng):
+    for _ in range(ROUNDS):
+        message = random_message(rng)
+        name = random_text(rng)
+        assert_valid(relay_text("💬", name, message))
+        assert_valid(relay_text("📸", name, message, "rasm yubordi"))
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from telegram import Chat, Message, Update, User
+from telegram.error import NetworkError
+
+import handlers
+from expiry import invitation_expiry
+
+A, B = 101, 202
+
+
+def partner_id_update(text):
+    user = User(A, 'Ali', False)
+    message = Message(
+        1, datetime.now(timezone.utc), Chat(A, 'private'), from_user=user, text=text
+    )
+    return Update(1, message=message)
+
+
+def make_context(fail_invite):
+    sent = iter(range(1, 100))
+
+    async def send_message(chat_id=None, text=None, **kwargs):
+        # Birinchi yuborish - tekshiruv xabari, ikkinchisi - taklif
+        if fail_invite and kwargs.get('reply_markup'):
+            raise NetworkError("connection reset")
+        return SimpleNamespace(message_id=next(sent))
+
+    bot = AsyncMock()
+    bot.username = 'test_bot'
+    bot.send_message.side_effect = send_message
+    bot.get_chat.return_value = SimpleNamespace(first_name='Vali')
+    return SimpleNamespace(bot=bot, user_data={'waiting_for_partner_id': True})
+
+
+def test_failed_invite_send_does_not_block_retry(database):
+    try:
+        context = make_context(fail_invite=True)
+        update = partner_id_update(str(B))
+        update.message.set_bot(context.bot)
+        asyncio.run(handlers.process_partner_id(update, context))
+        assert database.get_invitation(A, B) is None
+
+        context = make_context(fail_invite=False)
+        update.message.set_bot(context.bot)
+        asyncio.run(handlers.process_partner_id(update, context))
+        invitation = database.get_invitation(A, B)
+        assert invitation.status == 'pending'
+        assert invitation.message_id is not None
+    finally:
+        invitation_expiry._heap.clear()
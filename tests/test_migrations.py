@@ -0,0 +1,40 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def local_timezone():
+    # UTC dan farqli mahalliy vaqt (aks holda ikki soat bir xil)
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = 'Asia/Tashkent'
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+
+def test_duplicate_active_chats_end_in_local_time(database, local_timezone):
+    conn = database.conn
+    conn.commit()
+    # Unique indekslar va trigger paydo bo'lishidan oldingi baza
+    conn.execute('DROP INDEX idx_chats_active_user1')
+    conn.execute('DROP INDEX idx_chats_active_user2')
+    conn.execute('DROP TRIGGER trg_chats_one_active')
+    conn.execute('INSERT INTO chats (user1_id, user2_id) VALUES (101, 202)')
+    conn.execute('INSERT INTO chats (user1_id, user2_id) VALUES (101, 303)')
+    conn.commit()
+
+    assert database.create_tables()
+
+    closed = conn.execute(
+        'SELECT ended_at FROM chats WHERE is_active = 0'
+    ).fetchone()[0]
+    ended_at = datetime.fromisoformat(str(closed))
+    # end_chat bilan bir xil soat: datetime.now()
+    assert abs((datetime.now() - ended_at).total_seconds()) < 60
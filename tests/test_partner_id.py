@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from telegram import Chat, Message, Update, User
+
+import handlers
+from config import Config
+from expiry import invitation_expiry
+from ratelimit import RateLimiter
+
+A = 101
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = RateLimiter()
+    monkeypatch.setattr(handlers, 'rate_limiter', limiter)
+    yield limiter
+    invitation_expiry._heap.clear()
+
+
+def make_context():
+    bot = AsyncMock()
+    bot.username = 'test_bot'
+    bot.send_message.return_value = SimpleNamespace(message_id=1)
+    bot.get_chat.return_value = SimpleNamespace(first_name='Vali')
+    return SimpleNamespace(bot=bot, user_data={'waiting_for_partner_id': True})
+
+
+def send(context, text):
+    message = Message(
+        1, datetime.now(timezone.utc), Chat(A, 'private'),
+        from_user=User(A, 'Ali', False), text=text
+    )
+    message.set_bot(context.bot)
+    context.user_data['waiting_for_partner_id'] = True
+    asyncio.run(handlers.handle_message(Update(1, message=message), context))
+
+
+def replies(context):
+    return [call.kwargs.get('text') for call in context.bot.send_message.call_args_list
+            if call.kwargs.get('chat_id') == A]
+
+
+def test_typos_do_not_spend_invite_budget(database, limiter):
+    context = make_context()
+    for _ in range(5):
+        send(context, 'salom')
+    assert replies(context) == [Config.MESSAGES['invalid_id']] * 5
+
+    send(context, '202')
+    context.bot.get_chat.assert_awaited_with(202)
+
+
+def test_throttled_invites_are_told_once(database, limiter):
+    context = make_context()
+    burst = Config.RATE_LIMITS['invite'][1]
+    for partner_id in range(202, 202 + burst):
+        send(context, str(partner_id))
+    assert context.bot.get_chat.await_count == burst
+
+    send(context, '300')
+    send(context, '301')
+    assert context.bot.get_chat.await_count == burst
+    assert replies(context).count(Config.MESSAGES['invite_slow_down']) == 1
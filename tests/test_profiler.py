@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import time
+
+from profiler import SamplingProfiler
+
+
+def spin(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_samples_only_the_event_loop_thread():
+    profiler = SamplingProfiler(interval=0.002)
+    stop = threading.Event()
+    # Kutayotgan boshqa thread natijaga tushmasligi kerak
+    idler = threading.Thread(target=stop.wait, name='idler', daemon=True)
+    idler.start()
+
+    async def main():
+        task = asyncio.ensure_future(profiler.profile(0.3))
+        await asyncio.sleep(0.05)
+        spin(0.15)
+        return await task
+
+    try:
+        stacks, samples = asyncio.run(main())
+    finally:
+        stop.set()
+
+    assert samples > 0
+    assert sum(stacks.values()) == samples
+    assert {stack[0] for stack in stacks} == {threading.current_thread().name}
+
+    own, inclusive = profiler.hot_functions(stacks, top=None)
+    assert sum(count for _, count in own) <= samples
+    assert any(label.endswith(':spin') for label, _ in inclusive)
+    assert not any(label.startswith('selectors:') for label, _ in own)
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from telegram import Chat, Message, Update, User
+
+import handlers
+from relaymap import RelayMap, relay_map
+
+A, B, C = 101, 202, 303
+
+
+def edited_update(user_id, message_id, text):
+    user = User(user_id, 'Ali', False)
+    message = Message(
+        message_id, datetime.now(timezone.utc), Chat(user_id, 'private'),
+        from_user=user, text=text
+    )
+    return Update(1, edited_message=message)
+
+
+@pytest.fixture
+def links(database):
+    relay_map._chats.clear()
+    yield relay_map
+    relay_map._chats.clear()
+
+
+def test_lookup_falls_back_to_table(links, database):
+    chat_id = database.create_chat(A, B)
+    links.record(chat_id, A, 10, B, 500, 'text', 'salom')
+    links._chats.clear()
+
+    partner_message_id, db_message_id = links.lookup(chat_id, A, 10)
+    assert partner_message_id == 500
+    assert links.lookup(chat_id, B, 500) == (10, db_message_id)
+
+
+def test_links_do_not_leak_into_next_chat(links, database):
+    first = database.create_chat(A, B)
+    links.record(first, A, 10, B, 500, 'text', 'salom')
+    assert database.end_chat(first)
+    links.forget(first)
+
+    second = database.create_chat(A, C)
+    assert links.lookup(second, A, 10) is None
+    assert database.get_relayed(first, A, 10) is None
+
+
+def test_lookup_is_scoped_to_chat(database):
+    links = RelayMap(per_chat=10)
+    first = database.create_chat(A, B)
+    links.record(first, A, 10, B, 500, 'text', 'salom')
+    links._chats.clear()
+
+    assert links.lookup(first + 1, A, 10) is None
+
+
+def test_edit_after_new_chat_is_not_relayed(links, database):
+    first = database.create_chat(A, B)
+    links.record(first, A, 10, B, 500, 'text', 'salom')
+    database.end_chat(first)
+    links.forget(first)
+    database.create_chat(A, C)
+
+    context = SimpleNamespace(bot=AsyncMock())
+    asyncio.run(handlers.handle_edited_message(edited_update(A, 10, 'tahrir'), context))
+
+    context.bot.edit_message_text.assert_not_called()
+    context.bot.edit_message_caption.assert_not_called()
+    messages, _, _ = database.get_chat_messages(first)
+    assert [message.content for message in messages] == ['salom']
@@ -0,0 +1,57 @@
+def rollup_totals(database):
+    return dict(database.conn.execute(
+        'SELECT metric, SUM(value) FROM stats_daily GROUP BY metric'
+    ).fetchall())
+
+
+def test_repeated_local_time_is_counted(database):
+    conn = database.conn
+    conn.execute('INSERT INTO chats (user1_id, user2_id) VALUES (101, 202)')
+    conn.execute('INSERT INTO chats (user1_id, user2_id) VALUES (303, 404)')
+    conn.execute('''
+        INSERT INTO invitations (sender_id, receiver_id, status)
+        VALUES (101, 202, 'pending'), (303, 404, 'pending')
+    ''')
+    conn.commit()
+
+    # DST qaytishi: ikkinchi hodisaning mahalliy vaqti birinchisidan oldin
+    conn.execute("UPDATE chats SET is_active = 0, ended_at = '2026-10-25 01:50:00' WHERE chat_id = 1")
+    conn.execute("UPDATE invitations SET status = 'accepted', responded_at = '2026-10-25 01:50:00' "
+                 "WHERE invitation_id = 1")
+    conn.commit()
+    assert database.refresh_rollups()
+
+    conn.execute("UPDATE chats SET is_active = 0, ended_at = '2026-10-25 01:10:00' WHERE chat_id = 2")
+    conn.execute("UPDATE invitations SET status = 'accepted', responded_at = '2026-10-25 01:10:00' "
+                 "WHERE invitation_id = 2")
+    conn.commit()
+    assert database.refresh_rollups()
+
+    totals = rollup_totals(database)
+    assert totals['chats_ended'] == 2
+    assert totals['invitations_accepted'] == 2
+
+    # Qayta yig'ish ikki marta sanamaydi, tozalashdan keyin ham
+    assert database.cleanup_old_data()
+    assert database.refresh_rollups()
+    assert rollup_totals(database) == totals
+    assert conn.execute('SELECT COUNT(*) FROM rollup_events').fetchone()[0] == 0
+
+
+def test_upgrade_moves_uncounted_rows_to_events(database):
+    conn = database.conn
+    conn.execute('DROP TRIGGER rollup_chat_ended')
+    conn.execute('DROP TRIGGER rollup_invitation_accepted')
+    conn.execute('DROP TABLE rollup_events')
+    conn.execute('''
+        INSERT INTO chats (user1_id, user2_id, is_active, ended_at)
+        VALUES (101, 202, 0, '2026-10-01 10:00:00'), (303, 404, 0, '2026-10-02 10:00:00')
+    ''')
+    # v3 dagi vaqt bo'yicha watermark: birinchi chat allaqachon sanalgan
+    conn.execute("INSERT INTO rollup_state (metric, watermark) VALUES ('chats_ended', '2026-10-01 10:00:00')")
+    conn.commit()
+
+    assert database.create_rollup_tables()
+    assert database.refresh_rollups()
+
+    assert rollup_totals(database)['chats_ended'] == 1
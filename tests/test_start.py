@@ -0,0 +1,38 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from telegram import Chat, Message, Update, User
+
+import handlers
+
+A = 101
+
+
+def press_start(context):
+    message = Message(
+        1, datetime.now(timezone.utc), Chat(A, 'private'),
+        from_user=User(A, 'Ali', False), text='/start'
+    )
+    message.set_bot(context.bot)
+    asyncio.run(handlers.start_command(Update(1, message=message), context))
+
+
+def test_start_refreshes_activity_for_unchanged_profile(database):
+    context = SimpleNamespace(bot=AsyncMock(), user_data={})
+    press_start(context)
+
+    stale = datetime.now() - timedelta(days=90)
+    database.conn.execute(
+        'UPDATE users SET last_active = ?, unreachable_at = ? WHERE user_id = ?',
+        (stale, stale, A)
+    )
+    database.conn.commit()
+
+    # Profil keshda va o'zgarmagan - add_user yozmaydi
+    press_start(context)
+
+    user = database.get_user(A)
+    assert datetime.fromisoformat(str(user.last_active)) > stale + timedelta(days=89)
+    assert user.unreachable_at is None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Update tracelarining xulosasi (tracing.py yozgan OTLP/JSON fayllardan)
+
+Span nomlari bo'yicha umumiy vaqt va persentillar, keyin eng sekin
+tracelar daraxt ko'rinishida chiqariladi:
+    python traces.py --top 5
+    python traces.py traces.jsonl.1 traces.jsonl --name send_photo
+"""
+
+import argparse
+import glob
+import json
+import sys
+from collections import defaultdict
+
+from config import Config
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tracelar xulosasi")
+    parser.add_argument('files', nargs='*',
+                        help="trace fayllari (standart: TRACE_FILE va uning zaxiralari)")
+    parser.add_argument('--top', type=int, default=10, help="eng sekin tracelar soni")
+    parser.add_argument('--name', help="faqat shu nomli span bor tracelar (qism satr)")
+    parser.add_argument('--min-ms', type=float, default=0, help="shundan tez tracelar tashlanadi")
+    return parser.parse_args()
+
+def default_files():
+    """Aylangan fayllar eskidan yangiga: traces.jsonl.5 ... traces.jsonl"""
+    backups = sorted(
+        glob.glob(f"{Config.TRACE_FILE}.*"),
+        key=lambda path: int(path.rsplit('.', 1)[-1]) if path.rsplit('.', 1)[-1].isdigit() else 0,
+        reverse=True
+    )
+    return backups + [Config.TRACE_FILE]
+
+def attribute_value(value):
+    for kind in ('stringValue', 'intValue', 'doubleValue', 'boolValue'):
+        if kind in value:
+            return value[kind]
+    return None
+
+def read_spans(paths):
+    """traceId -> spanlar ro'yxati (buzilgan qatorlar o'tkazib yuboriladi)"""
+    traces = defaultdict(list)
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    for resource in record.get('resourceSpans', []):
+                        for scope in resource.get('scopeSpans', []):
+                            for span in scope.get('spans', []):
+                                traces[span['traceId']].append({
+                                    'id': span['spanId'],
+                                    'parent': span.get('parentSpanId') or None,
+                                    'name': span['name'],
+                                    'start': int(span['startTimeUnixNano']),
+                                    'ms': (int(span['endTimeUnixNano'])
+                                           - int(span['startTimeUnixNano'])) / 1e6,
+                                    'attributes': {
+                                        item['key']: attribute_value(item['value'])
+                                        for item in span.get('attributes', [])
+                                    },
+                                    'error': span.get('status', {}).get('message'),
+                                })
+        except FileNotFoundError:
+            continue
+    return traces
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def print_summary(traces):
+    """Span nomi bo'yicha: soni, jami vaqt, p50, p95, maks."""
+    durations = defaultdict(list)
+    for spans in traces.values():
+        for span in spans:
+            durations[span['name']].append(span['ms'])
+
+    print(f"{'span':<44} {'soni':>6} {'jami ms':>10} {'p50':>8} {'p95':>8} {'maks.':>8}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        print(
+            f"{name[:44]:<44} {len(values):>6} {sum(values):>10.1f} "
+            f"{percentile(values, 0.5):>8.1f} {percentile(values, 0.95):>8.1f} {max(values):>8.1f}"
+        )
+
+def print_tree(spans):
+    """Bitta trace: spanlar boshlanish vaqti tartibida, ichma-ich"""
+    children = defaultdict(list)
+    for span in spans:
+        children[span['parent']].append(span)
+    known = {span['id'] for span in spans}
+    roots = [span for span in spans if span['parent'] not in known]
+    origin = min(span['start'] for span in spans)
+
+    def walk(span, depth):
+        attributes = ' '.join(f"{key}={value}" for key, value in span['attributes'].items())
+        error = f"  ❌ {span['error']}" if span['error'] else ''
+        print(
+            f"  {(span['start'] - origin) / 1e6:>+8.1f}ms {span['ms']:>8.1f}ms  "
+            f"{'  ' * depth}{span['name']} {attributes}{error}".rstrip()
+        )
+        for child in sorted(children[span['id']], key=lambda item: item['start']):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda item: item['start']):
+        walk(root, 0)
+
+def main():
+    """Asosiy funksiya"""
+    args = parse_args()
+    traces = read_spans(args.files or default_files())
+    if args.name:
+        traces = {
+            trace_id: spans for trace_id, spans in traces.items()
+            if any(args.name in span['name'] for span in spans)
+        }
+
+    def total(spans):
+        roots = [span['ms'] for span in spans if span['parent'] is None]
+        return max(roots) if roots else max(span['ms'] for span in spans)
+
+    traces = {trace_id: spans for trace_id, spans in traces.items() if total(spans) >= args.min_ms}
+    if not traces:
+        print("Tracelar topilmadi")
+        sys.exit(1)
+
+    print(f"{len(traces)} ta trace\n")
+    print_summary(traces)
+
+    slowest = sorted(traces.items(), key=lambda item: -total(item[1]))[:args.top]
+    print(f"\nEng sekin {len(slowest)} ta trace:")
+    for trace_id, spans in slowest:
+        print(f"\n{trace_id} - {total(spans):.1f}ms, {len(spans)} span")
+        print_tree(spans)
+
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
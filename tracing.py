@@ -0,0 +1,201 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Joriy span (asyncio tasklar va to_thread ga kontekst bilan birga o'tadi)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+SERVICE_NAME = "sevishganlar-bot"
+
+# OTLP status kodlari
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    """Bitta o'lchangan amal (update, handler, database so'rovi, Bot API chaqiruvi)"""
+    __slots__ = ('spans', 'trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+                 'start_ns', '_started', 'duration_ns', 'error')
+
+    def __init__(self, spans, trace_id, parent_id, name, attributes):
+        self.spans = spans  # trace dagi barcha spanlar (root bilan umumiy ro'yxat)
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self.duration_ns = 0
+        self.error = None
+        spans.append(self)
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration_ns = time.perf_counter_ns() - self._started
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.start_ns + self.duration_ns),
+            'attributes': [otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error
+                      else {'code': STATUS_OK},
+        }
+        return span
+
+def otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+class Tracer:
+    """Har bir update uchun spanlar daraxti (head-based sampling).
+
+    Namuna olish qarori faqat root span (update) boshlanganda qilinadi:
+    tanlanmagan updatelarda ichki spanlar bitta contextvar o'qishdan
+    iborat. Tugagan trace OTLP/JSON ko'rinishida (bir qatorga bitta trace)
+    aylanuvchi faylga yoziladi - `python traces.py` xulosa chiqaradi.
+    """
+
+    def __init__(self, sample_rate=None, path=None):
+        self.sample_rate = Config.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.path = path or Config.TRACE_FILE
+        self._writer = None
+        self.sampled = 0
+        self.exported = 0
+
+    @property
+    def enabled(self):
+        return self._writer is not None and self.sample_rate > 0
+
+    def open(self):
+        """Eksport faylini ochadi (sample_rate 0 bo'lsa trace yozilmaydi)"""
+        if self._writer or self.sample_rate <= 0:
+            return
+        handler = RotatingFileHandler(
+            self.path, maxBytes=Config.TRACE_MAX_BYTES,
+            backupCount=Config.TRACE_BACKUP_COUNT, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._writer = logging.getLogger('tracing.export')
+        self._writer.propagate = False
+        self._writer.setLevel(logging.INFO)
+        self._writer.addHandler(handler)
+        logger.info(f"Tracing: {self.sample_rate:.1%} updatelar -> {self.path}")
+
+    def close(self):
+        if self._writer:
+            for handler in list(self._writer.handlers):
+                self._writer.removeHandler(handler)
+                handler.close()
+            self._writer = None
+
+    @contextmanager
+    def trace(self, name, **attributes):
+        """Root span: shu yerda trace yozilishi (sampling) hal qilinadi"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        self.sampled += 1
+        span = Span([], os.urandom(16).hex(), None, name, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            self.export(span.spans)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Ichki span (trace tanlanmagan bo'lsa hech narsa qilmaydi)"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = Span(parent.spans, parent.trace_id, parent.span_id, name, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+
+    def traced(self, name=None):
+        """Funksiyani (sync yoki async) span ichida bajaradigan dekorator"""
+        def decorator(func):
+            span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if _current_span.get() is None:
+                        return await func(*args, **kwargs)
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return func(*args, **kwargs)
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def export(self, spans):
+        """Trace ni OTLP/JSON (resourceSpans) qatori sifatida yozadi"""
+        if not self._writer:
+            return
+        try:
+            record = {'resourceSpans': [{
+                'resource': {'attributes': [otlp_attribute('service.name', SERVICE_NAME)]},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [span.to_otlp() for span in spans],
+                }],
+            }]}
+            self._writer.info(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            self.exported += 1
+        except Exception as e:
+            logger.error(f"Trace ni yozishda xato: {e}")
+
+    def get_stats(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'sampled': self.sampled,
+            'exported': self.exported,
+        }
+
+# Global obyekt
+tracer = Tracer()
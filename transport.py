@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+import httpx
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+from telegram._utils.defaultvalue import DefaultValue
+from config import Config
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class PooledRequest(HTTPXRequest):
+    """Sozlanadigan pool va kutish statistikasi bilan Bot API so'rovi.
+
+    Bir vaqtdagi so'rovlar pool hajmi bilan cheklanadi; bo'sh ulanish
+    kutilgan vaqt o'lchanadi, shuning uchun /stat pool yetishmayotganini
+    ko'rsatadi.
+    """
+
+    def __init__(self, name, pool_size, read_timeout=None, http_version=None):
+        self.name = name
+        self.pool_size = pool_size
+        self._slots = asyncio.Semaphore(pool_size)
+        self.requests = 0
+        self.in_flight = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.max_wait = 0.0
+        self.pool_timeouts = 0
+
+        super().__init__(
+            connection_pool_size=pool_size,
+            read_timeout=read_timeout or Config.HTTP_READ_TIMEOUT,
+            write_timeout=Config.HTTP_WRITE_TIMEOUT,
+            connect_timeout=Config.HTTP_CONNECT_TIMEOUT,
+            pool_timeout=Config.HTTP_POOL_TIMEOUT,
+            http_version=http_version or Config.HTTP_VERSION
+        )
+
+    def _build_client(self):
+        # PTB keep-alive muddatini sozlashga imkon bermaydi
+        self._client_kwargs['limits'] = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY
+        )
+        return super()._build_client()
+
+    async def do_request(self, url, method, request_data=None,
+                         read_timeout=HTTPXRequest.DEFAULT_NONE,
+                         write_timeout=HTTPXRequest.DEFAULT_NONE,
+                         connect_timeout=HTTPXRequest.DEFAULT_NONE,
+                         pool_timeout=HTTPXRequest.DEFAULT_NONE):
+        # Bot API metodi nomi bilan span (pool kutish vaqti ham ichida)
+        with tracer.span(f"telegram.{url.rsplit('/', 1)[-1]}", pool=self.name) as span:
+            status, payload = await self._pooled_request(
+                url, method, request_data,
+                read_timeout, write_timeout, connect_timeout, pool_timeout
+            )
+            if span:
+                span.set('http.status_code', status)
+            return status, payload
+
+    async def _pooled_request(self, url, method, request_data,
+                              read_timeout, write_timeout, connect_timeout, pool_timeout):
+        if isinstance(pool_timeout, DefaultValue):
+            pool_timeout = self._client.timeout.pool
+
+        self.requests += 1
+        if self._slots.locked():
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), pool_timeout)
+            except asyncio.TimeoutError:
+                self.pool_timeouts += 1
+                raise TimedOut(f"Pool timeout: {self.name} poolida bo'sh ulanish yo'q") from None
+            waited = time.monotonic() - started
+            self.waited += 1
+            self.wait_total += waited
+            self.max_wait = max(self.max_wait, waited)
+        else:
+            await self._slots.acquire()
+
+        self.in_flight += 1
+        try:
+            return await super().do_request(
+                url, method, request_data,
+                read_timeout=read_timeout,
+                write_timeout=write_timeout,
+                connect_timeout=connect_timeout,
+                pool_timeout=pool_timeout
+            )
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def get_stats(self):
+        """Pool statistikasi"""
+        return {
+            'name': self.name,
+            'pool_size': self.pool_size,
+            'http_version': self.http_version,
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'waited': self.waited,
+            'avg_wait': self.wait_total / self.waited if self.waited else 0.0,
+            'max_wait': self.max_wait,
+            'pool_timeouts': self.pool_timeouts,
+        }
+
+def build_request(name, pool_size, read_timeout=None):
+    """So'rov obyektini yaratadi, HTTP/2 o'rnatilmagan bo'lsa 1.1 ga qaytadi"""
+    try:
+        return PooledRequest(name, pool_size, read_timeout)
+    except RuntimeError as e:
+        if Config.HTTP_VERSION != '2':
+            raise
+        logger.warning(f"HTTP/2 ishlatib bo'lmadi, HTTP/1.1 ishlatiladi: {e}")
+        return PooledRequest(name, pool_size, read_timeout, http_version='1.1')
+
+class BotTransport:
+    """Polling va chiquvchi so'rovlar uchun alohida poollar.
+
+    Uzoq kutadigan getUpdates relay va broadcast yuborishlari bilan bitta
+    ulanishni bo'lishmaydi.
+    """
+
+    def __init__(self):
+        self.send = None
+        self.poll = None
+
+    def configure(self, builder):
+        """ApplicationBuilder ga so'rov obyektlarini o'rnatadi"""
+        self.send = build_request('send', Config.HTTP_SEND_POOL_SIZE)
+        self.poll = build_request('poll', Config.HTTP_POLL_POOL_SIZE,
+                                  read_timeout=Config.HTTP_POLL_READ_TIMEOUT)
+        logger.info(
+            f"HTTP poollar: send={self.send.pool_size}, poll={self.poll.pool_size}, "
+            f"HTTP/{self.send.http_version}"
+        )
+        return builder.request(self.send).get_updates_request(self.poll)
+
+    def get_stats(self):
+        """Har ikki pool statistikasi (sozlanmagan bo'lsa bo'sh)"""
+        return [pool.get_stats() for pool in (self.send, self.poll) if pool]
+
+# Global obyekt
+bot_transport = BotTransport()